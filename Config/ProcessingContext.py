@@ -1,4 +1,5 @@
 import os
+import threading
 
 
 class ProcessingContext:
@@ -10,4 +11,22 @@ class ProcessingContext:
         self.output_folder = output_folder
         self.raw_audio_path = os.path.join(output_folder, "raw_audio.wav")
         self.cleaned_audio_path = os.path.join(
-            output_folder, "cleaned_speech.wav")
\ No newline at end of file
+            output_folder, "cleaned_speech.wav")
+        # Decoded straight from an upload stream, when that succeeded.
+        self.raw_audio = None
+        # Populated by the in-memory pipeline: the cleaned float32 buffer that
+        # every later stage slices instead of re-reading cleaned_audio_path.
+        self.audio = None
+        self.sample_rate = None
+        # Set instead when the buffer lives in shared memory for a process pool.
+        self.shared_audio = None
+        # SHA-256 of the uploaded video, used as the result cache address.
+        self.file_hash = None
+        # Every result streamed to the client, kept for the result cache.
+        self.results = []
+        # Set when a segment or translation failed; such results are not cached.
+        self.failed = False
+        # Set when the client goes away; work stops at the next segment boundary.
+        self.cancelled = threading.Event()
+        # TaskProfiler when this task is profiled; None costs nothing.
+        self.profiler = None
@@ -6,9 +6,49 @@ class TranscriptionConfig:
         model_name: str = "small",
         max_workers: int = 1,
         min_silence_duration: float = 0.7,
-        silence_threshold: int = -35
+        silence_threshold: int = -35,
+        in_memory: bool = True,
+        skip_denoise: bool = False,
+        denoise_chunk_seconds: float = 30.0,
+        reorder_window: int = 8,
+        translation_batch_size: int = 8,
+        translation_batch_timeout_ms: float = 50,
+        execution_mode: str = "thread",
+        cpu_threads: int = 0,
+        num_workers: int = 1,
+        batch_size: int = 1,
+        beam_size: int = 5
     ):
         self.model_name = model_name
         self.max_workers = max_workers
         self.min_silence_duration = min_silence_duration
-        self.silence_threshold = silence_threshold
\ No newline at end of file
+        self.silence_threshold = silence_threshold
+        # Keep the decoded audio in one NumPy buffer instead of round-tripping
+        # through raw_audio.wav / cleaned_speech.wav and per-segment cuts.
+        self.in_memory = in_memory
+        # Clean studio audio can skip noise reduction entirely.
+        self.skip_denoise = skip_denoise
+        # Denoise in overlap-added chunks of this length; 0 processes the
+        # whole signal at once.
+        self.denoise_chunk_seconds = denoise_chunk_seconds
+        # How many jobs past the oldest unfinished one may be in flight;
+        # bounds the results held back to keep subtitles in timeline order.
+        self.reorder_window = max(
+            reorder_window, max_workers * max(1, batch_size))
+        # MarianMT micro-batching: translate up to this many segments per
+        # generate call, waiting at most this long to fill a batch.
+        self.translation_batch_size = max(1, translation_batch_size)
+        self.translation_batch_timeout_ms = translation_batch_timeout_ms
+        # "thread" shares one WhisperModel between max_workers threads;
+        # "process" runs max_workers processes with a model each and needs
+        # in_memory audio. cpu_threads / num_workers are passed to every
+        # WhisperModel instance (cpu_threads=0: CTranslate2 default, or an
+        # even split of the cores in process mode). The server caps all
+        # three at its worker budget and CPU count.
+        self.execution_mode = execution_mode if in_memory else "thread"
+        self.cpu_threads = cpu_threads
+        self.num_workers = num_workers
+        # batch_size > 1 packs up to that many short (<= 30 s) in-memory
+        # segments into one faster-whisper encoder batch (thread mode only).
+        self.batch_size = max(1, batch_size)
+        self.beam_size = beam_size
@@ -5,17 +5,10 @@ import librosa
 import webrtcvad
 import noisereduce as nr
 import soundfile as sf
+import threading
 import time
 
 
-def get_video_duration(video_path):
-    cmd = ["ffprobe", "-v", "error", "-show_entries", "format=duration",
-           "-of", "default=noprint_wrappers=1:nokey=1", video_path]
-    result = subprocess.run(
-        cmd, stdout=subprocess.PIPE, text=True, check=True)
-    return float(result.stdout.strip())
-
-
 def extract_audio_from_video(video_path, output_path, logger):
     print("Extracting audio from video...")
     start_time = time.time()
@@ -37,40 +30,213 @@ def extract_audio_from_video(video_path, output_path, logger):
         raise
 
 
+def load_audio_from_video(video_path, logger, sample_rate=16000):
+    """Decode the video's audio track once into a mono float32 buffer."""
+    print("Decoding audio from video into memory...")
+    start_time = time.time()
+    decode_cmd = ["ffmpeg", "-i", video_path, "-vn", "-loglevel", "error",
+                  "-f", "s16le", "-acodec", "pcm_s16le", "-ar", str(sample_rate), "-ac", "1", "pipe:1"]
+    try:
+        result = subprocess.run(decode_cmd, check=True, capture_output=True)
+    except subprocess.CalledProcessError as e:
+        print(f"[ERROR] FFmpeg failed: {e.stderr.decode(errors='replace')}")
+        raise
+    except FileNotFoundError:
+        print(
+            "[ERROR] FFmpeg not found. Please ensure FFmpeg is installed and added to your PATH.")
+        raise
+    audio = np.frombuffer(result.stdout, dtype=np.int16).astype(
+        np.float32) / 32768.0
+    elapsed_time = time.time() - start_time
+    logger.log_step("Load Audio from Video", elapsed_time,
+                    f"Video: {video_path}, Samples: {len(audio)}, Sample Rate: {sample_rate} Hz")
+    return audio, sample_rate
+
+
+def load_audio_from_stream(stream, logger, sample_rate=16000, on_chunk=None, chunk_size=1024 * 1024):
+    """Decode audio by piping a file object into ffmpeg's stdin as it is read.
+
+    `on_chunk` sees every chunk of the input (e.g. to hash it), even if ffmpeg
+    exits early. Raises CalledProcessError when ffmpeg cannot decode from a
+    pipe, e.g. an MP4 whose index is at the end of the file.
+    """
+    print("Decoding audio from upload stream...")
+    start_time = time.time()
+    decode_cmd = ["ffmpeg", "-i", "pipe:0", "-vn", "-loglevel", "error",
+                  "-f", "s16le", "-acodec", "pcm_s16le", "-ar", str(sample_rate), "-ac", "1", "pipe:1"]
+    process = subprocess.Popen(decode_cmd, stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    outputs = {}
+    readers = [threading.Thread(target=lambda name=name, pipe=pipe: outputs.__setitem__(name, pipe.read()))
+               for name, pipe in (("stdout", process.stdout), ("stderr", process.stderr))]
+    for reader in readers:
+        reader.start()
+    pipe_open = True
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        if on_chunk:
+            on_chunk(chunk)
+        if pipe_open:
+            try:
+                process.stdin.write(chunk)
+            except (BrokenPipeError, OSError):
+                pipe_open = False
+    try:
+        process.stdin.close()
+    except (BrokenPipeError, OSError):
+        pass
+    process.wait()
+    for reader in readers:
+        reader.join()
+    if process.returncode != 0:
+        stderr = outputs.get("stderr", b"").decode(errors="replace")
+        print(f"[ERROR] FFmpeg failed: {stderr}")
+        raise subprocess.CalledProcessError(
+            process.returncode, decode_cmd, stderr=stderr)
+    audio = np.frombuffer(outputs["stdout"], dtype=np.int16).astype(
+        np.float32) / 32768.0
+    elapsed_time = time.time() - start_time
+    logger.log_step("Load Audio from Stream", elapsed_time,
+                    f"Samples: {len(audio)}, Sample Rate: {sample_rate} Hz")
+    return audio, sample_rate
+
+
+def get_vad_frame_length(sr, frame_duration_ms=30):
+    return int(sr * frame_duration_ms / 1000)
+
+
 def get_speech_mask(audio, sr, logger, frame_duration_ms=30):
+    """Return one webrtcvad decision per frame (the last frame is zero-padded).
+
+    The signal is converted to int16 once and each frame is handed to the VAD
+    as a memoryview into that buffer. Use `expand_speech_mask` or
+    `get_noise_profile` instead of materialising a per-sample mask.
+    """
     start_time = time.time()
     vad = webrtcvad.Vad(3)
-    frame_length = int(sr * frame_duration_ms / 1000)
-    padded_audio = np.pad(
-        audio, (0, frame_length - len(audio) % frame_length), mode='constant')
-    frames = np.reshape(padded_audio, (-1, frame_length))
-    speech_mask = np.zeros(len(audio), dtype=bool)
-    for i, frame in enumerate(frames):
-        byte_data = (frame * 32768).astype(np.int16).tobytes()
-        is_speech = vad.is_speech(byte_data, sample_rate=sr)
-        if is_speech:
-            start = i * frame_length
-            end = min((i + 1) * frame_length, len(audio))
-            speech_mask[start:end] = True
+    frame_length = get_vad_frame_length(sr, frame_duration_ms)
+    n_frames = -(-len(audio) // frame_length)
+    pcm = np.zeros(n_frames * frame_length, dtype=np.int16)
+    pcm[:len(audio)] = np.clip(audio * 32768, -32768, 32767)
+    pcm_bytes = memoryview(pcm.tobytes())
+    frame_bytes = frame_length * pcm.itemsize
+    frame_mask = np.fromiter(
+        (vad.is_speech(pcm_bytes[offset:offset + frame_bytes], sample_rate=sr)
+         for offset in range(0, len(pcm_bytes), frame_bytes)),
+        dtype=bool, count=n_frames)
     elapsed_time = time.time() - start_time
     logger.log_step("Get Speech Mask", elapsed_time,
-                    f"Audio Length: {len(audio)} samples, Sample Rate: {sr} Hz")
-    return speech_mask
+                    f"Audio Length: {len(audio)} samples, Sample Rate: {sr} Hz, Frames: {n_frames}")
+    return frame_mask
+
+
+def expand_speech_mask(frame_mask, frame_length, n_samples):
+    """Expand a frame-level VAD mask to one bool per sample."""
+    return np.repeat(frame_mask, frame_length)[:n_samples]
+
 
+def get_noise_profile(audio, frame_mask, frame_length):
+    """Gather the samples of every non-speech frame without a per-sample mask."""
+    n_full = len(audio) // frame_length
+    frames = audio[:n_full * frame_length].reshape(-1, frame_length)
+    noise_profile = frames[~frame_mask[:n_full]].ravel()
+    if n_full < len(frame_mask) and not frame_mask[n_full]:
+        noise_profile = np.concatenate(
+            (noise_profile, audio[n_full * frame_length:]))
+    return noise_profile
 
-def isolate_speech_focused(audio_path, output_speech_path, logger):
+
+def reduce_speech_noise(y, sr, logger):
+    """Denoise a whole in-memory signal with non-stationary noise reduction.
+
+    Like `iter_denoised_blocks`, no VAD noise profile is built: noisereduce
+    only uses `y_noise` in stationary mode.
+    """
+    start_time = time.time()
+    reduced_audio = nr.reduce_noise(
+        y=y, sr=sr, stationary=False, prop_decrease=1.0, use_tqdm=True)
+    elapsed_time = time.time() - start_time
+    logger.log_step("Reduce Speech Noise", elapsed_time,
+                    f"Audio Length: {len(y)} samples, Sample Rate: {sr} Hz")
+    return reduced_audio.astype(np.float32, copy=False)
+
+
+def iter_denoised_blocks(audio, sr, chunk_seconds=30.0, overlap_seconds=0.5, preroll_seconds=2.0):
+    """Denoise `audio` chunk by chunk, yielding (start_sample, block) in order.
+
+    Each chunk is processed with `preroll_seconds` of discarded leading context
+    so the non-stationary noise floor is warmed up, and consecutive chunks are
+    cross-faded over `overlap_seconds`. Peak working memory is bounded by the
+    chunk size rather than the length of the video. The VAD noise profile is
+    not needed here: noisereduce only uses `y_noise` in stationary mode.
+    """
+    n = len(audio)
+    block = max(int(chunk_seconds * sr), 1)
+    overlap = int(overlap_seconds * sr)
+    preroll = int(preroll_seconds * sr)
+    fade_in = np.linspace(0.0, 1.0, overlap, endpoint=False, dtype=np.float32)
+    tail = None
+    pos = 0
+    while pos < n:
+        end = min(pos + block + overlap, n)
+        if n - end < block // 4:
+            end = n
+        lead = min(pos, preroll)
+        chunk = nr.reduce_noise(
+            y=audio[pos - lead:end], sr=sr, stationary=False, prop_decrease=1.0)
+        chunk = chunk[lead:].astype(np.float32, copy=False)
+        if tail is not None:
+            k = len(tail)
+            chunk[:k] = chunk[:k] * fade_in[:k] + tail * (1.0 - fade_in[:k])
+        if end == n:
+            yield pos, chunk
+            return
+        yield pos, chunk[:block]
+        tail = chunk[block:].copy()
+        pos += block
+
+
+def iter_prepared_audio_blocks(raw_audio, sr, logger, skip_denoise=False, chunk_seconds=30.0):
+    """Yield (start_sample, block) of cleaned audio as soon as each block is ready.
+
+    If noise reduction fails part-way, the remaining blocks are passed
+    through from the raw audio.
+    """
+    start_time = time.time()
+    emitted = 0
+    if not skip_denoise:
+        try:
+            if chunk_seconds > 0:
+                for start, block in iter_denoised_blocks(raw_audio, sr, chunk_seconds):
+                    yield start, block
+                    emitted = start + len(block)
+            else:
+                yield 0, reduce_speech_noise(raw_audio, sr, logger)
+                emitted = len(raw_audio)
+        except Exception as e:
+            print(f"[ERROR] Failed to isolate speech: {e}")
+            print("[WARNING] Using original audio instead.")
+    step = max(int(chunk_seconds * sr), 1) if chunk_seconds > 0 else len(raw_audio)
+    for start in range(emitted, len(raw_audio), max(step, 1)):
+        yield start, raw_audio[start:start + step]
+    elapsed_time = time.time() - start_time
+    logger.log_step("Prepare Audio Blocks", elapsed_time,
+                    f"Samples: {len(raw_audio)}, Denoised Samples: {emitted}")
+
+
+def isolate_speech_focused(audio_path, output_speech_path, logger, chunk_seconds=0):
     start_time = time.time()
     try:
         y, sr = librosa.load(audio_path, sr=None, mono=True)
-        speech_mask = get_speech_mask(y, sr, logger)
-        noise_profile = y[~speech_mask]
-        if len(noise_profile) < 1:
-            print(
-                "[WARN] No noise profile could be generated, falling back to full audio")
-            noise_profile = y
-        reduced_audio = nr.reduce_noise(
-            y=y, sr=sr, y_noise=noise_profile, stationary=False, prop_decrease=1.0, use_tqdm=True)
-        sf.write(output_speech_path, reduced_audio, sr)
+        if chunk_seconds > 0:
+            with sf.SoundFile(output_speech_path, "w", samplerate=sr, channels=1) as out:
+                for _, block in iter_denoised_blocks(y, sr, chunk_seconds):
+                    out.write(block)
+        else:
+            reduced_audio = reduce_speech_noise(y, sr, logger)
+            sf.write(output_speech_path, reduced_audio, sr)
         print(f"[SUCCESS] Isolated speech saved to: {output_speech_path}")
         elapsed_time = time.time() - start_time
         logger.log_step("Isolate Speech Focused", elapsed_time,
@@ -84,92 +250,218 @@ def isolate_speech_focused(audio_path, output_speech_path, logger):
         return None
 
 
-def prepare_audio(video_path, raw_audio_path, cleaned_audio_path, logger):
+def prepare_audio(video_path, raw_audio_path, cleaned_audio_path, logger, skip_denoise=False, chunk_seconds=0):
     start_time = time.time()
     extract_audio_from_video(video_path, raw_audio_path, logger)
-    result = isolate_speech_focused(raw_audio_path, cleaned_audio_path, logger)
+    result = None
+    if not skip_denoise:
+        result = isolate_speech_focused(
+            raw_audio_path, cleaned_audio_path, logger, chunk_seconds)
     if not result:
-        print("[WARNING] Using original audio instead.")
+        if not skip_denoise:
+            print("[WARNING] Using original audio instead.")
         shutil.copy(raw_audio_path, cleaned_audio_path)
     elapsed_time = time.time() - start_time
     logger.log_step("Prepare Audio", elapsed_time,
                     f"Video: {video_path}, Raw: {raw_audio_path}, Cleaned: {cleaned_audio_path}")
 
 
-def detect_silent_points(audio_path, logger, min_silence_duration=0.7, silence_threshold_db=-35):
-    start_time = time.time()
-    audio, sr = librosa.load(audio_path, sr=None)
-    frame_length = 2048
-    hop_length = 512
+def describe_audio(audio):
+    """Short label for log lines: the path, or the size of an in-memory buffer."""
+    if isinstance(audio, str):
+        return audio
+    return f"<in-memory, {len(audio)} samples>"
+
+
+def get_audio_duration(audio, sr=None):
+    """Duration in seconds from the sample count, or from the WAV header for a path."""
+    if isinstance(audio, str):
+        return sf.info(audio).duration
+    return len(audio) / sr
+
+
+def compute_rms_db(audio, sr=None, frame_length=2048, hop_length=512):
+    """Return (rms_db, sr): the RMS envelope in dB relative to its peak."""
+    if isinstance(audio, str):
+        audio, sr = librosa.load(audio, sr=None)
     rms = librosa.feature.rms(
         y=audio, frame_length=frame_length, hop_length=hop_length)[0]
-    db = librosa.amplitude_to_db(rms, ref=np.max)
-    silent_regions = []
-    silent_start = None
-    for i, value in enumerate(db):
-        current_time = i * hop_length / sr
-        if value < silence_threshold_db:
-            if silent_start is None:
-                silent_start = current_time
-        else:
-            if silent_start is not None:
-                silent_duration = current_time - silent_start
-                if silent_duration >= min_silence_duration:
-                    midpoint = silent_start + silent_duration / 2
-                    silent_regions.append(midpoint)
-                silent_start = None
+    return librosa.amplitude_to_db(rms, ref=np.max), sr
+
+
+def find_silent_runs(silent_mask):
+    """Return (starts, ends) frame indices of silent runs closed by a loud frame.
+
+    A run still open at the end of the mask is not reported.
+    """
+    edges = np.diff(np.concatenate(
+        ([False], silent_mask)).astype(np.int8))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return starts[:len(ends)], ends
+
+
+def detect_silent_points(audio, logger, min_silence_duration=0.7, silence_threshold_db=-35, sr=None,
+                         rms_db=None, hop_length=512):
+    """Return the midpoints (seconds) of silences lasting at least min_silence_duration.
+
+    Pass a precomputed `rms_db` envelope (see `compute_rms_db`) together with
+    `sr` to try several thresholds without recomputing features.
+    """
+    start_time = time.time()
+    if rms_db is None:
+        rms_db, sr = compute_rms_db(audio, sr, hop_length=hop_length)
+    starts, ends = find_silent_runs(rms_db < silence_threshold_db)
+    frame_seconds = hop_length / sr
+    durations = (ends - starts) * frame_seconds
+    keep = durations >= min_silence_duration
+    silent_regions = (starts[keep] * frame_seconds +
+                      durations[keep] / 2).tolist()
     elapsed_time = time.time() - start_time
     logger.log_step("Detect Silent Points", elapsed_time,
-                    f"Audio: {audio_path}, Silent Regions Found: {len(silent_regions)}")
+                    f"Audio: {describe_audio(audio) if audio is not None else '<precomputed RMS>'}, Silent Regions Found: {len(silent_regions)}")
     return silent_regions
 
 
-def segment_audio(audio_path, video_path, min_silence_duration, silence_threshold, logger):
+def segment_audio(audio, min_silence_duration, silence_threshold, logger, sr=None):
     print("Detecting silent points for segmentation...")
     start_time = time.time()
+    rms_db, sr = compute_rms_db(audio, sr)
     silent_points = detect_silent_points(
-        audio_path, logger, min_silence_duration, silence_threshold)
+        audio, logger, min_silence_duration, silence_threshold, sr=sr, rms_db=rms_db)
     silent_points = sorted(set(round(p, 2) for p in silent_points))
-    video_duration = subprocess.run(["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of",
-                                    "default=noprint_wrappers=1:nokey=1", video_path], stdout=subprocess.PIPE, text=True, check=True)
-    video_duration = float(video_duration.stdout.strip())
-    if len(silent_points) < 3:
-        print("Few silent points detected. Creating time-based segments...")
-        segment_length = 30
-        silent_points = [
-            i * segment_length for i in range(1, int(video_duration / segment_length))]
+    video_duration = get_audio_duration(audio, sr)
+    # Long stretches without silence are split by the job planner.
     silent_points = [p for p in silent_points if p < video_duration - 1]
     elapsed_time = time.time() - start_time
     logger.log_step("Segment Audio", elapsed_time,
-                    f"Audio: {audio_path}, Video: {video_path}, Segments: {len(silent_points)}")
+                    f"Audio: {describe_audio(audio)}, Segments: {len(silent_points)}")
     return silent_points
 
 
-def create_segment_jobs(silent_points, video_duration, logger):
-    start_time = time.time()
-    points = [0.0] + silent_points + [video_duration]
-    jobs = []
-    for idx in range(len(points) - 1):
-        start = points[idx]
-        end = points[idx + 1]
-        if start < end:
-            jobs.append((start, end, idx))
-    elapsed_time = time.time() - start_time
-    logger.log_step("Create Segment Jobs", elapsed_time,
-                    f"Total Jobs: {len(jobs)}, Video Duration: {video_duration:.2f}s")
-    return jobs
+class IncrementalSegmenter:
+    """Turn a stream of audio blocks into (start, end, idx) jobs as silences are confirmed.
+
+    Uses the same RMS framing as `compute_rms_db` (centered 2048/512 frames),
+    but dB values are relative to the loudest frame seen so far rather than
+    the whole file, since the peak is not known up front. A job that reaches
+    `max_segment_length` without a confirmed silence is cut at the quietest
+    frame of its second half, which replaces the time-based fallback of
+    `segment_audio`.
+    """
+
+    def __init__(self, sr, min_silence_duration=0.7, silence_threshold_db=-35, max_segment_length=30.0,
+                 frame_length=2048, hop_length=512):
+        self.sr = sr
+        self.min_silence_duration = min_silence_duration
+        self.silence_threshold_db = silence_threshold_db
+        self.max_segment_length = max_segment_length
+        self.frame_length = frame_length
+        self.hop_length = hop_length
+        # librosa centres frames by zero-padding half a frame at the start.
+        self._carry = np.zeros(frame_length // 2, dtype=np.float32)
+        self._frame_offset = 0
+        self._silent_start = None
+        self._ref = 0.0
+        self._n_samples = 0
+        self._last_point = 0.0
+        self._next_idx = 0
+        # dB of the frames since the last job boundary, for forced cuts.
+        self._history = np.empty(0)
+        self._history_start = 0
+
+    def _emit(self, point):
+        job = (self._last_point, point, self._next_idx)
+        self._last_point = point
+        self._next_idx += 1
+        drop = int(point * self.sr / self.hop_length) - self._history_start
+        if drop > 0:
+            self._history = self._history[drop:]
+            self._history_start += drop
+        return job
+
+    def _forced_cut(self):
+        """The quietest analysed frame in the second half of the maximum segment length."""
+        frame_seconds = self.hop_length / self.sr
+        low = int(np.ceil((self._last_point + self.max_segment_length / 2) / frame_seconds))
+        high = int((self._last_point + self.max_segment_length) / frame_seconds) + 1
+        window = self._history[max(low - self._history_start, 0):max(high - self._history_start, 0)]
+        if len(window) == 0:
+            return round(self._last_point + self.max_segment_length, 2)
+        frame = max(low, self._history_start) + int(np.argmin(window))
+        return round(frame * frame_seconds, 2)
+
+    def _emit_until(self, point):
+        jobs = []
+        while point - self._last_point > self.max_segment_length:
+            jobs.append(self._emit(self._forced_cut()))
+        if point > self._last_point:
+            jobs.append(self._emit(point))
+        return jobs
+
+    def _frame_db(self, block):
+        buf = np.concatenate((self._carry, block))
+        n_frames = 0
+        if len(buf) >= self.frame_length:
+            n_frames = (len(buf) - self.frame_length) // self.hop_length + 1
+        frames = np.lib.stride_tricks.sliding_window_view(
+            buf, self.frame_length)[::self.hop_length][:n_frames]
+        self._carry = buf[n_frames * self.hop_length:]
+        rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+        if n_frames:
+            self._ref = max(self._ref, float(rms.max()))
+        return 20 * np.log10(np.maximum(rms, 1e-5)) - 20 * np.log10(max(self._ref, 1e-5))
+
+    def feed(self, block):
+        """Consume the next block of audio and return any jobs it completes."""
+        self._n_samples += len(block)
+        db = self._frame_db(block)
+        self._history = np.concatenate((self._history, db))
+        pending = self._silent_start is not None
+        edges = np.diff(np.concatenate(
+            ([pending], db < self.silence_threshold_db)).astype(np.int8))
+        starts = self._frame_offset + np.flatnonzero(edges == 1)
+        ends = self._frame_offset + np.flatnonzero(edges == -1)
+        if pending:
+            starts = np.concatenate(([self._silent_start], starts))
+        self._silent_start = starts[len(ends)] if len(
+            starts) > len(ends) else None
+        self._frame_offset += len(db)
+
+        frame_seconds = self.hop_length / self.sr
+        starts = starts[:len(ends)]
+        durations = (ends - starts) * frame_seconds
+        keep = durations >= self.min_silence_duration
+        jobs = []
+        for point in starts[keep] * frame_seconds + durations[keep] / 2:
+            jobs.extend(self._emit_until(round(float(point), 2)))
+        analysed = self._frame_offset * frame_seconds
+        while analysed - self._last_point > self.max_segment_length:
+            jobs.append(self._emit(self._forced_cut()))
+        return jobs
+
+    def finish(self):
+        """Return the remaining jobs once the whole signal has been fed."""
+        duration = self._n_samples / self.sr
+        return self._emit_until(duration)
+
 
+def cut_audio_segment(input_audio, start_time, end_time, logger, sample_rate=16000):
+    """Read [start_time, end_time) of a WAV file as a mono float32 array.
 
-def cut_audio_segment(input_audio, output_path, start_time, end_time, logger):
+    Seeks straight to the segment's frames, so no subprocess or temporary
+    file is needed per job.
+    """
     start_time_segment = time.time()
-    cmd = ["ffmpeg", "-y", "-ss",
-           str(start_time), "-i", input_audio, "-loglevel", "error"]
-    if end_time is not None:
-        duration = float(end_time) - float(start_time)
-        cmd.extend(["-t", str(duration)])
-    cmd.append(output_path)
-    subprocess.run(cmd, check=True, capture_output=True)
+    with sf.SoundFile(input_audio) as f:
+        sr = f.samplerate
+        f.seek(min(int(start_time * sr), f.frames))
+        frames = -1 if end_time is None else max(0, int(end_time * sr) - f.tell())
+        audio = f.read(frames, dtype="float32", always_2d=True).mean(axis=1)
+    if sr != sample_rate:
+        audio = librosa.resample(audio, orig_sr=sr, target_sr=sample_rate)
     elapsed_time = time.time() - start_time_segment
     logger.log_step("Cut Audio Segment", elapsed_time,
-                    f"Input: {input_audio}, Output: {output_path}, Start: {start_time:.2f}s, End: {end_time if end_time is not None else 'N/A'}")
-    return output_path
+                    f"Input: {input_audio}, Start: {start_time:.2f}s, End: {end_time if end_time is not None else 'N/A'}, "
+                    f"Samples: {len(audio)}")
+    return audio
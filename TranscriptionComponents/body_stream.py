@@ -0,0 +1,56 @@
+import asyncio
+
+
+class BodyStreamReader:
+    """Blocking file-like view of a request body that an async handler feeds as it arrives.
+
+    The handler awaits `feed` for each received chunk and `end` after the
+    last one; a worker thread calls `read`, which blocks until data is
+    available and returns b"" at the end. At most `max_chunks` chunks are
+    buffered, so a slow reader applies backpressure to the upload. `close`
+    (from any thread) abandons the body: buffered and later chunks are
+    dropped and `read` returns b"".
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_chunks: int = 64):
+        self._loop = loop
+        self._chunks = asyncio.Queue(max_chunks)
+        self._buffer = b""
+        self._eof = False
+        self._abandoned = False
+
+    async def feed(self, chunk: bytes):
+        if chunk and not self._abandoned:
+            await self._chunks.put(chunk)
+
+    async def end(self):
+        if not self._abandoned:
+            await self._chunks.put(b"")
+
+    def read(self, size: int = -1) -> bytes:
+        if not self._buffer:
+            if self._eof:
+                return b""
+            self._buffer = asyncio.run_coroutine_threadsafe(
+                self._chunks.get(), self._loop).result()
+            if not self._buffer:
+                self._eof = True
+                return b""
+        if size is None or size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+    def close(self):
+        try:
+            self._loop.call_soon_threadsafe(self._abandon)
+        except RuntimeError:
+            # The event loop has shut down; nobody is feeding any more.
+            pass
+
+    def _abandon(self):
+        self._abandoned = True
+        while not self._chunks.empty():
+            self._chunks.get_nowait()
+        # Wakes a reader blocked in `read`.
+        self._chunks.put_nowait(b"")
@@ -0,0 +1,109 @@
+import time
+
+import numpy as np
+import soundfile as sf
+
+# Jobs are sized for Whisper's 30 s input window, with a little headroom.
+TARGET_JOB_SECONDS = 28.0
+MAX_JOB_SECONDS = 30.0
+# Shorter jobs are only worth their fixed per-call overhead to keep workers busy.
+MIN_JOB_SECONDS = 5.0
+
+
+def choose_target_length(duration, max_workers=1, target_length=TARGET_JOB_SECONDS, min_length=MIN_JOB_SECONDS):
+    """Job length to aim for: near Whisper's window, but short enough that every worker gets a job."""
+    return min(target_length, max(min_length, duration / max(1, max_workers)))
+
+
+def quietest_point(audio, sr, start, end, frame_seconds=0.05):
+    """Time (seconds) of the lowest-energy 50 ms frame in [start, end], to cut where there is no silence.
+
+    `audio` is an in-memory buffer or a WAV path; only the window is read.
+    """
+    if isinstance(audio, str):
+        sr = sf.info(audio).samplerate
+        window, _ = sf.read(audio, start=int(start * sr), stop=int(end * sr), dtype="float32")
+        if window.ndim > 1:
+            window = window.mean(axis=1)
+    else:
+        window = audio[int(start * sr):int(end * sr)]
+    frame = max(1, int(frame_seconds * sr))
+    n_frames = len(window) // frame
+    if n_frames == 0:
+        return round(end, 2)
+    energy = np.mean(np.square(window[:n_frames * frame].reshape(n_frames, frame), dtype=np.float64), axis=1)
+    return round(start + (int(np.argmin(energy)) + 0.5) * frame / sr, 2)
+
+
+def describe_job_lengths(jobs):
+    """Job-length distribution for log lines."""
+    if not jobs:
+        return "Jobs: 0"
+    lengths = np.array([end - start for start, end, _ in jobs])
+    p50, p90 = np.percentile(lengths, [50, 90])
+    return (f"Jobs: {len(jobs)}, Min: {lengths.min():.2f}s, P50: {p50:.2f}s, P90: {p90:.2f}s, "
+            f"Max: {lengths.max():.2f}s, Total: {lengths.sum():.2f}s")
+
+
+def plan_segment_jobs(silent_points, duration, audio, sr, logger, max_workers=1,
+                      target_length=TARGET_JOB_SECONDS, max_length=MAX_JOB_SECONDS, min_tail=1.0):
+    """Turn silence midpoints into (start, end, idx) jobs of about the target length.
+
+    Each job runs to the farthest silence within the target length (see
+    `choose_target_length`), or to the next silence if that is still within
+    `max_length`. Speech with no usable silence is cut at the quietest point
+    of the second half of the target window. A remainder shorter than
+    `min_tail` is folded into the last job.
+    """
+    start_time = time.time()
+    target = choose_target_length(duration, max_workers, target_length)
+    points = sorted(p for p in silent_points if 0 < p < duration) + [duration]
+    jobs = []
+    start = 0.0
+    i = 0
+    while duration - start > 0.01:
+        while i < len(points) and points[i] <= start + 0.01:
+            i += 1
+        end = None
+        while i < len(points) and points[i] - start <= target:
+            end = points[i]
+            i += 1
+        if end is None:
+            if points[i] - start <= max_length:
+                end = points[i]
+                i += 1
+            else:
+                end = quietest_point(audio, sr, start + target / 2, start + target)
+        if 0 < duration - end < min_tail and duration - start <= max_length:
+            end = duration
+        jobs.append((start, end, len(jobs)))
+        start = end
+    elapsed_time = time.time() - start_time
+    logger.log_step("Plan Segment Jobs", elapsed_time,
+                    f"Target: {target:.1f}s, Silences: {len(points) - 1}, {describe_job_lengths(jobs)}")
+    return jobs
+
+
+def merge_streamed_jobs(jobs, target_length, first_length=MIN_JOB_SECONDS):
+    """Merge consecutive streamed jobs until each reaches about `target_length`, renumbering them.
+
+    The first job is released as soon as it reaches `first_length`, so the
+    first subtitles are not held back waiting for a full window.
+    """
+    idx = 0
+    pending_start = pending_end = None
+    for start, end, _ in jobs:
+        if pending_start is None:
+            pending_start, pending_end = start, end
+        elif end - pending_start <= target_length:
+            pending_end = end
+        else:
+            yield (pending_start, pending_end, idx)
+            idx += 1
+            pending_start, pending_end = start, end
+        if idx == 0 and pending_end - pending_start >= first_length:
+            yield (pending_start, pending_end, idx)
+            idx += 1
+            pending_start = pending_end = None
+    if pending_start is not None:
+        yield (pending_start, pending_end, idx)
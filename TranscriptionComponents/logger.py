@@ -1,19 +1,76 @@
 import threading
+import time
 from datetime import datetime
+from queue import Queue, Empty
+
+from TranscriptionComponents.metrics import PipelineMetrics
 
 
 class Logger:
-    def __init__(self, log_file="log.txt"):
+    """Step timing log: every step feeds the metrics histograms, and lines reach
+    the log file through a background writer that appends in batches."""
+
+    def __init__(self, log_file="log.txt", flush_interval=1.0):
         self.log_file = log_file
-        self.log_lock = threading.Lock()
+        self.flush_interval = flush_interval
+        self.metrics = PipelineMetrics()
+        self._records = Queue()
+        self._stop = object()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self.start()
+
+    def start(self):
+        """Start the background writer, unless it is running; lines logged while closed are kept for it."""
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_records, daemon=True)
+                self._writer.start()
 
     def log_step(self, step_name, elapsed_time, additional_info=None):
-        """Log the time taken for a step to the log file in a thread-safe manner."""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        """Record the time taken for a step; thread-safe and does no I/O on the caller's thread."""
+        self.metrics.observe(step_name, elapsed_time)
+        self._records.put((time.time(), step_name, elapsed_time, additional_info))
+
+    def close(self):
+        """Flush pending lines and stop the writer."""
+        with self._writer_lock:
+            writer, self._writer = self._writer, None
+            if writer is None:
+                return
+            self._records.put(self._stop)
+            writer.join()
+
+    @staticmethod
+    def _format(record):
+        logged_at, step_name, elapsed_time, additional_info = record
+        timestamp = datetime.fromtimestamp(logged_at).strftime("%Y-%m-%d %H:%M:%S")
         log_message = f"[{timestamp}] Step '{step_name}' completed in {elapsed_time:.2f} seconds"
         if additional_info:
             log_message += f" | {additional_info}"
-        log_message += "\n"
-        with self.log_lock:
-            with open(self.log_file, "a", encoding="utf-8") as f:
-                f.write(log_message)
+        return log_message + "\n"
+
+    def _write_records(self):
+        stop = False
+        while not stop:
+            try:
+                batch = [self._records.get(timeout=self.flush_interval)]
+            except Empty:
+                continue
+            # Let a burst accumulate so it costs one open and one write.
+            time.sleep(self.flush_interval)
+            while True:
+                try:
+                    batch.append(self._records.get_nowait())
+                except Empty:
+                    break
+            if self._stop in batch:
+                stop = True
+                batch = [record for record in batch if record is not self._stop]
+            if not batch:
+                continue
+            try:
+                with open(self.log_file, "a", encoding="utf-8") as f:
+                    f.write("".join(self._format(record) for record in batch))
+            except OSError as e:
+                print(f"[ERROR] Could not write log file {self.log_file}: {e}")
@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+
+
+class Histogram:
+    """Count, total and max of a timing, with percentiles over the most recent observations."""
+
+    def __init__(self, window: int = 2048):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.recent.append(value)
+
+    def snapshot(self) -> dict:
+        p50, p95, p99 = np.percentile(self.recent, [50, 95, 99]) if self.recent else (0.0, 0.0, 0.0)
+        return {
+            "count": self.count,
+            "total": round(self.total, 4),
+            "mean": round(self.total / self.count, 4) if self.count else 0.0,
+            "p50": round(float(p50), 4),
+            "p95": round(float(p95), 4),
+            "p99": round(float(p99), 4),
+            "max": round(self.max, 4),
+        }
+
+
+class TaskMetrics:
+    """Spans and totals of one transcription task."""
+
+    def __init__(self, task_id: str):
+        self.task_id = task_id
+        self.started_at = time.time()
+        self.spans = []
+        self.first_segment_seconds = None
+        self.segments = 0
+        self.audio_seconds = None
+        self.wall_seconds = None
+        self.status = "running"
+
+    def snapshot(self) -> dict:
+        wall_seconds = self.wall_seconds if self.wall_seconds is not None else time.time() - self.started_at
+        return {
+            "task_id": self.task_id,
+            "status": self.status,
+            "wall_seconds": round(wall_seconds, 3),
+            "audio_seconds": self.audio_seconds,
+            "real_time_factor": round(wall_seconds / self.audio_seconds, 4) if self.audio_seconds else None,
+            "time_to_first_segment": self.first_segment_seconds,
+            "segments": self.segments,
+            "spans": [{"stage": stage, "start": round(start, 3), "seconds": round(seconds, 4)}
+                      for stage, start, seconds in self.spans],
+        }
+
+
+class PipelineMetrics:
+    """In-memory stage histograms, counters and per-task spans for the /metrics endpoint.
+
+    Every method only updates memory under one lock, so it is cheap enough to
+    call once per segment. The last `keep_tasks` finished tasks are retained.
+    """
+
+    def __init__(self, window: int = 2048, keep_tasks: int = 50):
+        self.window = window
+        self.started_at = time.time()
+        self.stages = {}
+        self.counters = {}
+        self.active_tasks = {}
+        self.recent_tasks = OrderedDict()
+        self.keep_tasks = keep_tasks
+        self._lock = threading.Lock()
+
+    def _histogram(self, name: str) -> Histogram:
+        histogram = self.stages.get(name)
+        if histogram is None:
+            histogram = self.stages[name] = Histogram(self.window)
+        return histogram
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            self._histogram(stage).observe(seconds)
+
+    def count(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def start_task(self, task_id: str):
+        with self._lock:
+            self.active_tasks[task_id] = TaskMetrics(task_id)
+
+    def record_span(self, task_id: str, stage: str, started_at: float, seconds: float):
+        """Attribute a timed stage to a task; it is also observed in the stage histogram."""
+        with self._lock:
+            self._histogram(stage).observe(seconds)
+            task = self.active_tasks.get(task_id)
+            if task is not None:
+                task.spans.append((stage, started_at - task.started_at, seconds))
+
+    def segment_emitted(self, task_id: str):
+        with self._lock:
+            self.counters["segments"] = self.counters.get("segments", 0) + 1
+            task = self.active_tasks.get(task_id)
+            if task is None:
+                return
+            task.segments += 1
+            if task.first_segment_seconds is None:
+                task.first_segment_seconds = round(time.time() - task.started_at, 3)
+                self._histogram("Time To First Segment").observe(task.first_segment_seconds)
+
+    def finish_task(self, task_id: str, status: str = "completed", audio_seconds: float = None):
+        with self._lock:
+            task = self.active_tasks.pop(task_id, None)
+            if task is None:
+                return None
+            task.status = status
+            task.wall_seconds = time.time() - task.started_at
+            task.audio_seconds = round(audio_seconds, 3) if audio_seconds else None
+            self.counters[f"tasks_{status}"] = self.counters.get(f"tasks_{status}", 0) + 1
+            if task.audio_seconds:
+                self.counters["audio_seconds"] = self.counters.get("audio_seconds", 0) + task.audio_seconds
+                self._histogram("Task Real Time Factor").observe(task.wall_seconds / task.audio_seconds)
+            self.recent_tasks[task_id] = task
+            while len(self.recent_tasks) > self.keep_tasks:
+                self.recent_tasks.popitem(last=False)
+            return task.snapshot()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "uptime_seconds": round(time.time() - self.started_at, 1),
+                "counters": {name: round(value, 3) for name, value in self.counters.items()},
+                "stages": {name: histogram.snapshot() for name, histogram in sorted(self.stages.items())},
+                "active_tasks": [task.snapshot() for task in self.active_tasks.values()],
+                "recent_tasks": [task.snapshot() for task in reversed(self.recent_tasks.values())],
+            }
+
@@ -3,10 +3,16 @@ from transformers import MarianMTModel, MarianTokenizer
 from faster_whisper import WhisperModel
 import os
 
+TRANSLATION_MODEL_PATH = os.path.join("models", "marianmt_en_ar")
+
+
+def whisper_model_path(model_name):
+    return os.path.join("models", f"faster_whisper_{model_name}")
+
 
 def load_translation_model():
     """Load the MarianMT model and tokenizer from local directory."""
-    model_path = os.path.join("models", "marianmt_en_ar")
+    model_path = TRANSLATION_MODEL_PATH
     if not os.path.exists(model_path):
         raise FileNotFoundError(
             f"MarianMT model not found at {model_path}. Please download it first.")
@@ -18,20 +24,19 @@ def load_translation_model():
     return nmt_model, tokenizer
 
 
-def load_whisper_model(model_name):
-    """Load the Faster Whisper model from local directory."""
-    if model_name in globals().get('model_cache', {}):
-        return globals()['model_cache'][model_name]
+def load_whisper_model(model_name, cpu_threads=0, num_workers=1):
+    """Load the Faster Whisper model from local directory.
 
-    model_path = os.path.join("models", f"faster_whisper_{model_name}")
+    cpu_threads=0 lets CTranslate2 pick its default; num_workers is the number
+    of transcriptions the model instance may run concurrently. Caching is left
+    to the caller (see ModelRegistry).
+    """
+    model_path = whisper_model_path(model_name)
     if not os.path.exists(model_path):
         raise FileNotFoundError(
             f"Faster Whisper model not found at {model_path}. Please download it first.")
 
     print(f"Loading Faster Whisper model '{model_name}' from {model_path}...")
     device = "cuda" if torch.cuda.is_available() else "cpu"
-    model = WhisperModel(model_path, device=device, compute_type="int8")
-    if 'model_cache' not in globals():
-        globals()['model_cache'] = {}
-    globals()['model_cache'][model_name] = model
-    return model
+    return WhisperModel(model_path, device=device, compute_type="int8",
+                        cpu_threads=cpu_threads, num_workers=num_workers)
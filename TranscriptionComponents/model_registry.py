@@ -0,0 +1,191 @@
+import os
+import threading
+import time
+
+from TranscriptionComponents.model_loading import (
+    load_whisper_model, load_translation_model, whisper_model_path, TRANSLATION_MODEL_PATH)
+from TranscriptionComponents.process_pool import WhisperProcessPool
+
+
+def _directory_size_mb(path):
+    """On-disk size of a model directory, used as an estimate of its resident size."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total / (1024 * 1024)
+
+
+class ModelEntry:
+    """A resident model with its load and residency timings.
+
+    `close`, if set, is called with the model once it leaves the registry.
+    """
+
+    def __init__(self, key, model, size_mb, load_seconds, close=None):
+        self.key = key
+        self.model = model
+        self.size_mb = size_mb
+        self.load_seconds = load_seconds
+        self.close = close
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+        self.uses = 0
+
+    def stats(self, now):
+        return {
+            "model": self.key[0],
+            "options": list(self.key[1:]),
+            "size_mb": round(self.size_mb, 1),
+            "load_seconds": round(self.load_seconds, 3),
+            "resident_seconds": round(now - self.loaded_at, 1),
+            "idle_seconds": round(now - self.last_used, 1),
+            "uses": self.uses,
+        }
+
+
+class ModelRegistry:
+    """Loads Whisper and MarianMT models on demand and keeps them under a memory budget.
+
+    Models are loaded at most once per key, even when several requests ask at
+    the same time. When the estimated resident size exceeds `memory_budget_mb`,
+    or a model has been idle for longer than `idle_timeout_seconds`, the least
+    recently used models are dropped from the registry; tasks that still hold a
+    reference keep using theirs until they finish. The most recently used model
+    is never dropped for the budget alone, so one model larger than the budget
+    stays resident instead of being reloaded for every task. Whisper process
+    pools count once per worker process and are shut down when dropped, after
+    the tasks leasing them are done. Besides every load, eviction runs after each task
+    and, once `start_idle_sweep` was called, periodically while idle.
+    """
+
+    TRANSLATOR_KEY = ("marianmt_en_ar",)
+
+    def __init__(self, logger, memory_budget_mb: float = 4096, idle_timeout_seconds: float = 1800,
+                 whisper_loader=load_whisper_model, translation_loader=load_translation_model,
+                 pool_loader=WhisperProcessPool):
+        self.logger = logger
+        self.memory_budget_mb = memory_budget_mb
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.whisper_loader = whisper_loader
+        self.translation_loader = translation_loader
+        self.pool_loader = pool_loader
+        self._entries = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self._sweep_stop = None
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _get(self, key, load, path, copies=1, close=None):
+        with self._key_lock(key):
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is None:
+                start_time = time.time()
+                model = load()
+                elapsed_time = time.time() - start_time
+                entry = ModelEntry(key, model, _directory_size_mb(path) * copies, elapsed_time, close)
+                with self._lock:
+                    self._entries[key] = entry
+                self.logger.log_step("Load Model", elapsed_time,
+                                     f"Model: {key[0]}, Options: {list(key[1:])}, Size: {entry.size_mb:.0f} MB")
+            entry.last_used = time.time()
+            entry.uses += 1
+        self.evict(keep=key)
+        return entry.model
+
+    def get_whisper(self, model_name: str, cpu_threads: int = 0, num_workers: int = 1):
+        return self._get((model_name, cpu_threads, num_workers),
+                         lambda: self.whisper_loader(model_name, cpu_threads, num_workers),
+                         whisper_model_path(model_name))
+
+    def get_process_pool(self, model_name: str, num_processes: int, cpu_threads: int = 0,
+                         num_workers: int = 1) -> WhisperProcessPool:
+        """Return a process pool for this model and split, leased to the caller, who must `release()` it."""
+        while True:
+            pool = self._get((model_name, "process", num_processes, cpu_threads, num_workers),
+                             lambda: self.pool_loader(model_name, num_processes, cpu_threads, num_workers),
+                             whisper_model_path(model_name), copies=num_processes,
+                             close=WhisperProcessPool.retire)
+            if pool.acquire():
+                return pool
+            # Evicted and shut down between lookup and lease; load a new one.
+
+    def get_translator(self):
+        """Return (nmt_model, tokenizer), loading MarianMT on first use."""
+        return self._get(self.TRANSLATOR_KEY, self.translation_loader, TRANSLATION_MODEL_PATH)
+
+    def preload(self, model_names):
+        """Load the given Whisper sizes in a background thread."""
+        def run():
+            for model_name in model_names:
+                try:
+                    self.get_whisper(model_name)
+                except Exception as e:
+                    print(f"Failed to preload Whisper model '{model_name}': {e}")
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def start_idle_sweep(self, interval_seconds: float = 60):
+        """Run `evict` every `interval_seconds` in a background thread until `close`."""
+        with self._lock:
+            if self._sweep_stop is not None:
+                return
+            stop = self._sweep_stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval_seconds):
+                self.evict()
+
+        threading.Thread(target=run, name="model-idle-sweep", daemon=True).start()
+
+    def evict(self, keep=None):
+        """Drop idle models, then least recently used ones while over the memory budget."""
+        now = time.time()
+        with self._lock:
+            candidates = sorted(
+                (entry for key, entry in self._entries.items() if key != keep),
+                key=lambda entry: entry.last_used)
+            resident_mb = sum(entry.size_mb for entry in self._entries.values())
+            evicted = []
+            for entry in candidates:
+                over_budget = resident_mb > self.memory_budget_mb and len(self._entries) > 1
+                if now - entry.last_used > self.idle_timeout_seconds or over_budget:
+                    del self._entries[entry.key]
+                    resident_mb -= entry.size_mb
+                    evicted.append(entry)
+        for entry in evicted:
+            if entry.close is not None:
+                entry.close(entry.model)
+            self.logger.log_step("Evict Model", 0.0,
+                                 f"Model: {entry.key[0]}, Options: {list(entry.key[1:])}, Resident: {resident_mb:.0f} MB")
+
+    def close(self):
+        """Stop the idle sweep and shut down the process pools; in-process models stay loaded for a restart."""
+        with self._lock:
+            if self._sweep_stop is not None:
+                self._sweep_stop.set()
+                self._sweep_stop = None
+            closing = [entry for entry in self._entries.values() if entry.close is not None]
+            for entry in closing:
+                del self._entries[entry.key]
+        for entry in closing:
+            entry.close(entry.model)
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            entries = [entry.stats(now) for entry in self._entries.values()]
+        return {
+            "memory_budget_mb": self.memory_budget_mb,
+            "resident_mb": round(sum(entry["size_mb"] for entry in entries), 1),
+            "models": entries,
+        }
@@ -0,0 +1,199 @@
+import cProfile
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from TranscriptionComponents.model_loading import load_whisper_model
+from TranscriptionComponents.transcription_utils import transcribe_segment
+
+# Per-process state of pool workers: the model instance, the shared audio
+# buffers of running tasks this process has attached to, and the barrier
+# that spreads a finish_task call over every worker.
+_worker_model = None
+_worker_buffers = {}
+_worker_barrier = None
+# How long a worker waits for the others to take their finish_task call.
+_BROADCAST_TIMEOUT_SECONDS = 600
+# Profiles of profiled tasks in this worker, by output prefix.
+_worker_profiles = {}
+
+
+class SharedAudioBuffer:
+    """A float32 audio buffer in shared memory that pool workers can slice without pickling."""
+
+    def __init__(self, n_samples: int):
+        self.n_samples = n_samples
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=max(n_samples, 1) * np.dtype(np.float32).itemsize)
+        self.name = self._shm.name
+        self.array = np.ndarray((n_samples,), dtype=np.float32,
+                                buffer=self._shm.buf)
+
+    def close(self):
+        """Release and unlink the segment; callers must drop their views of `array` first."""
+        self.array = None
+        try:
+            self._shm.close()
+        except BufferError:
+            pass
+        self._shm.unlink()
+
+
+def _init_worker(model_name, cpu_threads, num_workers, barrier):
+    global _worker_model, _worker_barrier
+    _worker_barrier = barrier
+    _worker_model = load_whisper_model(model_name, cpu_threads, num_workers)
+
+
+def _attach(shm_name, n_samples):
+    if shm_name in _worker_buffers:
+        return _worker_buffers[shm_name][1]
+    # Spawned pool workers share the parent's resource tracker, so attaching
+    # here does not make the segment's lifetime depend on this process.
+    shm = shared_memory.SharedMemory(name=shm_name)
+    audio = np.ndarray((n_samples,), dtype=np.float32, buffer=shm.buf)
+    _worker_buffers[shm_name] = (shm, audio)
+    return audio
+
+
+def _finish_task(shm_name, profile_prefix=None):
+    """Detach this worker from a finished task's buffer and write its profile; run once per worker by finish_task."""
+    profile = _worker_profiles.pop(profile_prefix, None)
+    if profile is not None:
+        profile.dump_stats(f"{profile_prefix}.{os.getpid()}.prof")
+    attached = _worker_buffers.pop(shm_name, None)
+    if attached is not None:
+        shm = attached[0]
+        # Drop the array view first, or the mapping cannot be closed.
+        attached = None
+        try:
+            shm.close()
+        except BufferError:
+            pass
+    # Hold this worker until every other worker has taken its call too.
+    _worker_barrier.wait(_BROADCAST_TIMEOUT_SECONDS)
+
+
+def _transcribe_shared_segment(shm_name, n_samples, sample_rate, job, beam_size, profile_prefix=None):
+    start_time, end_time, _ = job
+    audio = _attach(shm_name, n_samples)
+    segment_audio = audio[int(start_time * sample_rate):int(end_time * sample_rate)]
+    if profile_prefix is None:
+        return transcribe_segment(_worker_model, segment_audio, start_time, end_time, beam_size)
+    profile = _worker_profiles.setdefault(profile_prefix, cProfile.Profile())
+    profile.enable()
+    try:
+        return transcribe_segment(_worker_model, segment_audio, start_time, end_time, beam_size)
+    finally:
+        # Accumulates over the task; _finish_task writes it out once.
+        profile.disable()
+
+
+class WhisperProcessPool:
+    """Process pool where every worker process holds its own WhisperModel instance.
+
+    cpu_threads=0 splits the machine's cores evenly across the processes.
+    Tasks hold a lease (`acquire` / `release`) while they use the pool; a
+    pool that was `retire`d shuts down when its last lease is released.
+    All workers are started up front, so `finish_task` can reach each one.
+    """
+
+    def __init__(self, model_name: str, num_processes: int, cpu_threads: int = 0, num_workers: int = 1):
+        if cpu_threads <= 0:
+            cpu_threads = max(1, (os.cpu_count() or 1) // num_processes)
+        self.model_name = model_name
+        self.num_processes = num_processes
+        self.cpu_threads = cpu_threads
+        self.num_workers = num_workers
+        # Forking a process that already runs uvicorn and CTranslate2
+        # threads is not safe; start clean interpreters instead.
+        context = multiprocessing.get_context("spawn")
+        self._barrier = context.Barrier(num_processes)
+        self.executor = ProcessPoolExecutor(
+            max_workers=num_processes,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(model_name, cpu_threads, num_workers, self._barrier)
+        )
+        self._lock = threading.Lock()
+        self._broadcast_lock = threading.Lock()
+        self._leases = 0
+        self._retired = False
+        self._closed = False
+        # Workers are spawned on demand; one call per worker starts them all.
+        self._broadcast(None)
+
+    def transcribe(self, shared_audio: SharedAudioBuffer, sample_rate: int, job, beam_size: int = 5,
+                   profile_prefix: str = None) -> list:
+        """Transcribe one (start, end, idx) job from `shared_audio` in a worker process.
+
+        With `profile_prefix`, the worker profiles the call into a profile
+        that `finish_task` writes to "<profile_prefix>.<pid>.prof".
+        """
+        return self.executor.submit(
+            _transcribe_shared_segment, shared_audio.name, shared_audio.n_samples, sample_rate, job,
+            beam_size, profile_prefix).result()
+
+    def finish_task(self, shared_audio: SharedAudioBuffer, profile_prefix: str = None):
+        """Make every worker detach from a finished task's audio buffer and write out its profile."""
+        self._broadcast(shared_audio.name, profile_prefix)
+
+    def _broadcast(self, shm_name, profile_prefix=None):
+        # One call per worker; the barrier in _finish_task keeps any worker
+        # from taking two, and the lock keeps two broadcasts from interleaving.
+        with self._broadcast_lock:
+            futures = [self.executor.submit(_finish_task, shm_name, profile_prefix)
+                       for _ in range(self.num_processes)]
+            broken = False
+            for future in futures:
+                try:
+                    future.result()
+                except threading.BrokenBarrierError:
+                    broken = True
+            if broken:
+                print("[WARNING] Not every pool worker answered the finish call in time.")
+                self._barrier.reset()
+
+    def acquire(self) -> bool:
+        """Lease the pool for a task. False if it has already shut down."""
+        with self._lock:
+            if self._closed:
+                return False
+            self._leases += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self._leases -= 1
+            close = self._retired and self._leases == 0 and not self._closed
+            self._closed = self._closed or close
+        if close:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def retire(self):
+        """Shut down now if no task holds a lease, otherwise when the last one is released."""
+        with self._lock:
+            self._retired = True
+            close = self._leases == 0 and not self._closed
+            self._closed = self._closed or close
+        if close:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def balance_by_duration(jobs, group_size: int):
+    """Reorder jobs longest-first within consecutive groups of `group_size`.
+
+    Groups stay in timeline order, so a look-ahead window of at least
+    `group_size` jobs can never deadlock on a job that was not yet submitted.
+    """
+    group = []
+    for job in jobs:
+        group.append(job)
+        if len(group) >= group_size:
+            yield from sorted(group, key=lambda j: j[0] - j[1])
+            group = []
+    yield from sorted(group, key=lambda j: j[0] - j[1])
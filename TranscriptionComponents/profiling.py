@@ -0,0 +1,115 @@
+import cProfile
+import glob
+import os
+import pstats
+import sys
+import threading
+
+PROFILES_DIR = "profiles"
+
+
+def profile_path(task_id: str) -> str:
+    return os.path.join(PROFILES_DIR, f"{task_id}.prof")
+
+
+def worker_profile_prefix(task_id: str) -> str:
+    """Prefix for the partial profiles pool worker processes write for a task."""
+    return os.path.join(PROFILES_DIR, f"{task_id}.worker")
+
+
+class TaskProfiler:
+    """cProfile capture of one task across every thread that does its work.
+
+    Before Python 3.12, cProfile only sees the thread that enabled it, so each
+    thread running task code gets its own Profile (via `wrap`), reused across
+    the units that thread runs. From 3.12 only one Profile can be active in
+    the interpreter and it sees every thread, so the task uses one shared
+    Profile, enabled around the whole task, and `wrap` is a no-op. Pool
+    worker processes write partial files under worker_profile_prefix(task_id).
+    `profile_task` runs the task itself and then merges everything into
+    profiles/<task_id>.prof.
+    """
+
+    def __init__(self, task_id: str):
+        self.task_id = task_id
+        self.path = profile_path(task_id)
+        self.per_thread = sys.version_info < (3, 12)
+        self._local = threading.local()
+        self._profiles = []
+        self._lock = threading.Lock()
+        self._warned = False
+        if not self.per_thread:
+            print(f"[INFO] Task {task_id}: profiling all threads with one shared profile "
+                  f"(per-thread profiles need Python < 3.12).")
+
+    def _warn_unprofiled(self, reason):
+        with self._lock:
+            if self._warned:
+                return
+            self._warned = True
+        print(f"[WARNING] Task {self.task_id}: some work is not profiled, {reason}.")
+
+    def _thread_profile(self):
+        profile = getattr(self._local, "profile", None)
+        if profile is None:
+            profile = self._local.profile = cProfile.Profile()
+            with self._lock:
+                self._profiles.append(profile)
+        return profile
+
+    def wrap(self, fn):
+        """Return `fn` running under this thread's profile for the task.
+
+        With a shared profile, `fn` is returned as is; the task's profile
+        already sees this thread.
+        """
+        if not self.per_thread:
+            return fn
+        return self._profiled(fn)
+
+    def _profiled(self, fn):
+        def profiled(*args, **kwargs):
+            profile = self._thread_profile()
+            try:
+                profile.enable()
+            except ValueError:
+                self._warn_unprofiled("another profiler is already active" if self.per_thread else
+                                      "another task's profile is active and Python 3.12+ allows only one")
+                return fn(*args, **kwargs)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profile.disable()
+        return profiled
+
+    def profile_task(self, run):
+        """Return `run` profiled, saving the merged profile when it finishes."""
+        # On 3.12+ the task thread's profile is the shared one.
+        profiled = self._profiled(run)
+
+        def run_and_save():
+            try:
+                profiled()
+            finally:
+                self.save()
+        return run_and_save
+
+    def save(self):
+        os.makedirs(PROFILES_DIR, exist_ok=True)
+        with self._lock:
+            profiles = [profile for profile in self._profiles if profile.getstats()]
+        worker_files = glob.glob(glob.escape(worker_profile_prefix(self.task_id)) + "*")
+        sources = profiles + worker_files
+        if not sources:
+            return
+        try:
+            stats = pstats.Stats(*sources)
+            stats.dump_stats(self.path)
+        except Exception as e:
+            print(f"[ERROR] Could not save profile for task {self.task_id}: {e}")
+        finally:
+            for worker_file in worker_files:
+                try:
+                    os.remove(worker_file)
+                except OSError:
+                    pass
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from Config.TranscriptionConfig import TranscriptionConfig
+
+
+class ResultCache:
+    """Content-addressed store of finished segment streams and reusable intermediates.
+
+    Finished results are keyed on the upload hash plus every setting that
+    affects the output. The cleaned audio and its segment jobs are keyed only
+    on the settings that produce them, so a re-run with a different Whisper
+    model or output language can skip decoding, denoising and segmentation.
+    """
+
+    def __init__(self, root: str = os.path.join("cache", "results"), max_audio_entries: int = 8,
+                 max_result_entries: int = 256):
+        self.root = root
+        self.max_audio_entries = max_audio_entries
+        self.max_result_entries = max_result_entries
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def _digest(fields: dict) -> str:
+        return hashlib.sha256(json.dumps(fields, sort_keys=True).encode("utf-8")).hexdigest()
+
+    @classmethod
+    def audio_key(cls, file_hash: str, config: TranscriptionConfig) -> str:
+        return cls._digest({
+            "file": file_hash,
+            "min_silence_duration": config.min_silence_duration,
+            "silence_threshold": config.silence_threshold,
+            "skip_denoise": config.skip_denoise,
+            "denoise_chunk_seconds": config.denoise_chunk_seconds,
+        })
+
+    @classmethod
+    def result_key(cls, file_hash: str, config: TranscriptionConfig, language: bool) -> str:
+        return cls._digest({
+            "audio": cls.audio_key(file_hash, config),
+            "model_name": config.model_name,
+            "beam_size": config.beam_size,
+            "batch_size": config.batch_size,
+            "language": language,
+        })
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.root, f"{key}{suffix}")
+
+    def _write_atomic(self, path: str, write):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+
+    def load_results(self, key: str):
+        """Return the stored segment stream for `key`, or None."""
+        path = self._path(key, ".jsonl")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def store_results(self, key: str, results: list):
+        payload = "".join(json.dumps(result) + "\n" for result in results)
+        self._write_atomic(self._path(key, ".jsonl"),
+                           lambda f: f.write(payload.encode("utf-8")))
+        self._evict(".jsonl", (".jsonl",), self.max_result_entries)
+
+    def load_audio(self, key: str):
+        """Return (audio, sample_rate, jobs) for `key`, or None. The audio is memory-mapped."""
+        audio_path = self._path(key, ".npy")
+        jobs_path = self._path(key, ".jobs.json")
+        if not (os.path.exists(audio_path) and os.path.exists(jobs_path)):
+            return None
+        with open(jobs_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        audio = np.load(audio_path, mmap_mode="r")
+        return audio, meta["sample_rate"], [tuple(job) for job in meta["jobs"]]
+
+    def store_audio(self, key: str, audio, sample_rate: int, jobs: list):
+        self._write_atomic(self._path(key, ".npy"),
+                           lambda f: np.save(f, np.asarray(audio)))
+        meta = json.dumps({"sample_rate": sample_rate,
+                          "jobs": [list(job) for job in jobs]})
+        self._write_atomic(self._path(key, ".jobs.json"),
+                           lambda f: f.write(meta.encode("utf-8")))
+        self._evict(".npy", (".npy", ".jobs.json"), self.max_audio_entries)
+
+    def _evict(self, suffix: str, suffixes: tuple, max_entries: int):
+        """Keep the `max_entries` most recently written entries whose main file ends in `suffix`."""
+        entries = []
+        for name in os.listdir(self.root):
+            if name.endswith(suffix):
+                try:
+                    entries.append((os.path.getmtime(os.path.join(self.root, name)), name[:-len(suffix)]))
+                except OSError:
+                    pass
+        entries.sort()
+        for _, key in entries[:max(0, len(entries) - max_entries)]:
+            for extension in suffixes:
+                try:
+                    os.remove(self._path(key, extension))
+                except OSError:
+                    pass
@@ -0,0 +1,24 @@
+import asyncio
+
+
+class ResultChannel:
+    """Hands streamed results from worker threads to an async response generator.
+
+    `put` may be called from any thread; it schedules the item onto the event
+    loop that owns the channel, so the consumer simply awaits `get` instead of
+    polling a thread queue.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._queue = asyncio.Queue()
+
+    def put(self, item):
+        try:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+        except RuntimeError:
+            # The event loop has shut down; nobody is left to read the result.
+            pass
+
+    async def get(self):
+        return await self._queue.get()
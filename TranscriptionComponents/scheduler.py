@@ -0,0 +1,242 @@
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+
+class SchedulerFullError(Exception):
+    """Raised when the task queue is at its maximum depth."""
+
+    def __init__(self, retry_after_seconds=None):
+        super().__init__("Transcription queue is full")
+        self.retry_after_seconds = retry_after_seconds
+
+
+class TaskExecutor:
+    """Per-task view of the scheduler's shared workers, used like a ThreadPoolExecutor."""
+
+    def __init__(self, scheduler, task_id: str):
+        self.scheduler = scheduler
+        self.task_id = task_id
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        return self.scheduler._submit_unit(self.task_id, fn, args, kwargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.scheduler._close_task_units(self.task_id)
+        return False
+
+
+class TranscriptionScheduler:
+    """Server-wide admission control and fair sharing of segment workers.
+
+    At most `max_active_tasks` transcriptions run at once; up to
+    `max_queue_depth` more wait in FIFO order and are told their position and
+    an ETA, beyond that submissions are rejected. Segment work from every
+    running task is executed by one pool of `worker_budget` threads, picking
+    tasks round-robin so a long video cannot starve a short one. A task never
+    holds more than its own `max_workers` of those threads.
+
+    `shutdown` stops the workers and cancels queued units; `start` brings
+    them back, so a server can be stopped and started again.
+    """
+
+    def __init__(self, worker_budget: int = None, max_active_tasks: int = 2, max_queue_depth: int = 16):
+        self.worker_budget = max(1, worker_budget or os.cpu_count() or 1)
+        self.max_active_tasks = max(1, max_active_tasks)
+        self.max_queue_depth = max(0, max_queue_depth)
+        self._waiting = deque()
+        self._active = {}
+        self._units = {}
+        self._running = {}
+        self._caps = {}
+        self._order = []
+        self._next_task = 0
+        self._average_task_seconds = None
+        self._completed_tasks = 0
+        self._rejected_tasks = 0
+        self._condition = threading.Condition()
+        # Bumped by start/shutdown; workers of an older generation exit.
+        self._generation = 0
+        self._running_workers = False
+        self.start()
+
+    def start(self):
+        """Start the segment workers, unless they are already running."""
+        with self._condition:
+            if self._running_workers:
+                return
+            self._running_workers = True
+            self._generation += 1
+            generation = self._generation
+        for i in range(self.worker_budget):
+            threading.Thread(target=self._segment_worker, args=(generation,),
+                             name=f"segment-worker-{i}", daemon=True).start()
+
+    def shutdown(self):
+        """Stop the segment workers after their current unit and cancel queued units.
+
+        Tasks still waiting for a slot are dropped.
+        """
+        with self._condition:
+            self._running_workers = False
+            self._generation += 1
+            self._waiting.clear()
+            for units in self._units.values():
+                for _, _, _, future in units:
+                    future.cancel()
+                units.clear()
+            self._condition.notify_all()
+
+    # Task admission
+
+    def is_running(self) -> bool:
+        """Whether the segment workers are running, i.e. the scheduler has not been shut down."""
+        with self._condition:
+            return self._running_workers
+
+    def is_full(self) -> bool:
+        with self._condition:
+            return len(self._waiting) >= self.max_queue_depth and len(self._active) >= self.max_active_tasks
+
+    def submit_task(self, task_id: str, run, notify=None):
+        """Queue `run()` as a transcription task; `notify(status)` receives queue updates.
+
+        Raises SchedulerFullError when the queue is at capacity.
+        """
+        with self._condition:
+            if len(self._waiting) >= self.max_queue_depth and len(self._active) >= self.max_active_tasks:
+                self._rejected_tasks += 1
+                raise SchedulerFullError(
+                    self._eta(len(self._waiting) + 1))
+            self._waiting.append((task_id, run, notify))
+            self._start_waiting_tasks(was_queued=False)
+
+    def cancel_task(self, task_id: str) -> bool:
+        """Drop `task_id` from the queue. Returns False if it already started (or is unknown)."""
+        with self._condition:
+            for entry in self._waiting:
+                if entry[0] == task_id:
+                    self._waiting.remove(entry)
+                    self._start_waiting_tasks()
+                    return True
+        return False
+
+    def _start_waiting_tasks(self, was_queued=True):
+        """Start queued tasks while there is room, then tell the rest where they stand.
+
+        Tasks that start immediately on submission get no status messages.
+        """
+        while self._waiting and len(self._active) < self.max_active_tasks:
+            task_id, run, notify = self._waiting.popleft()
+            self._active[task_id] = time.time()
+            if notify and was_queued:
+                notify({"status": "running", "position": 0})
+            threading.Thread(target=self._run_task, args=(task_id, run),
+                             name=f"task-{task_id}", daemon=True).start()
+        for position, (_, _, notify) in enumerate(self._waiting, start=1):
+            # Positions only move when a task leaves; a new arrival just learns its own.
+            if notify and (was_queued or position == len(self._waiting)):
+                notify({"status": "queued", "position": position,
+                        "eta_seconds": self._eta(position)})
+
+    def _run_task(self, task_id, run):
+        try:
+            run()
+        finally:
+            with self._condition:
+                elapsed = time.time() - self._active.pop(task_id)
+                self._completed_tasks += 1
+                if self._average_task_seconds is None:
+                    self._average_task_seconds = elapsed
+                else:
+                    self._average_task_seconds = 0.8 * \
+                        self._average_task_seconds + 0.2 * elapsed
+                self._start_waiting_tasks()
+
+    def _eta(self, position: int):
+        """Seconds until the task at `position` starts, from recent task durations."""
+        if self._average_task_seconds is None:
+            return None
+        return round(self._average_task_seconds * math.ceil(position / self.max_active_tasks), 1)
+
+    # Segment work
+
+    def executor(self, task_id: str, max_workers: int) -> TaskExecutor:
+        """Register `task_id` for segment work, capped at `max_workers` concurrent units."""
+        with self._condition:
+            self._units[task_id] = deque()
+            self._running[task_id] = 0
+            self._caps[task_id] = max(1, min(max_workers, self.worker_budget))
+            self._order.append(task_id)
+        return TaskExecutor(self, task_id)
+
+    def _submit_unit(self, task_id, fn, args, kwargs) -> Future:
+        future = Future()
+        with self._condition:
+            if not self._running_workers:
+                future.cancel()
+                return future
+            self._units[task_id].append((fn, args, kwargs, future))
+            self._condition.notify()
+        return future
+
+    def _close_task_units(self, task_id):
+        with self._condition:
+            for _, _, _, future in self._units.pop(task_id, ()):
+                future.cancel()
+            self._running.pop(task_id, None)
+            self._caps.pop(task_id, None)
+            if task_id in self._order:
+                self._order.remove(task_id)
+
+    def _next_unit(self):
+        for offset in range(len(self._order)):
+            i = (self._next_task + offset) % len(self._order)
+            task_id = self._order[i]
+            if self._units[task_id] and self._running[task_id] < self._caps[task_id]:
+                self._next_task = i + 1
+                self._running[task_id] += 1
+                return task_id, self._units[task_id].popleft()
+        return None
+
+    def _segment_worker(self, generation):
+        while True:
+            with self._condition:
+                if generation != self._generation:
+                    return
+                picked = self._next_unit()
+                while picked is None:
+                    self._condition.wait()
+                    if generation != self._generation:
+                        return
+                    picked = self._next_unit()
+            task_id, (fn, args, kwargs, future) = picked
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+            with self._condition:
+                if task_id in self._running:
+                    self._running[task_id] -= 1
+                self._condition.notify_all()
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "worker_budget": self.worker_budget,
+                "max_active_tasks": self.max_active_tasks,
+                "max_queue_depth": self.max_queue_depth,
+                "active_tasks": len(self._active),
+                "queued_tasks": len(self._waiting),
+                "busy_workers": sum(self._running.values()),
+                "completed_tasks": self._completed_tasks,
+                "rejected_tasks": self._rejected_tasks,
+                "average_task_seconds": self._average_task_seconds,
+            }
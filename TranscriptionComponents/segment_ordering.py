@@ -0,0 +1,48 @@
+import threading
+
+
+class SegmentReorderBuffer:
+    """Release per-job transcription results in timeline order.
+
+    Workers may finish jobs in any order; results are held until every earlier
+    job has reported, then forwarded to `output_queue` with global,
+    monotonically increasing segment indices starting at 1. Job indices must
+    be contiguous from 0.
+    """
+
+    def __init__(self, output_queue, window: int = 8):
+        self.output_queue = output_queue
+        self.window = max(1, window)
+        self._pending = {}
+        self._next_job = 0
+        self._next_index = 1
+        self._condition = threading.Condition()
+
+    def wait_for_slot(self, job_idx: int):
+        """Block until `job_idx` is within the look-ahead window of the next job to release."""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: job_idx < self._next_job + self.window)
+
+    def track(self, future, job_indices):
+        """Report `job_indices` as empty if `future` is cancelled, so later jobs are not held back.
+
+        A cancelled unit never runs, so nothing else would ever `put` its jobs.
+        """
+        def on_done(done):
+            if done.cancelled():
+                for job_idx in job_indices:
+                    self.put(job_idx, [])
+        future.add_done_callback(on_done)
+
+    def put(self, job_idx: int, segments: list):
+        """Record the segments of one job (possibly empty) and release whatever is now in order."""
+        with self._condition:
+            self._pending[job_idx] = segments
+            while self._next_job in self._pending:
+                for segment in self._pending.pop(self._next_job):
+                    self.output_queue.put(
+                        {**segment, "index": self._next_index})
+                    self._next_index += 1
+                self._next_job += 1
+            self._condition.notify_all()
@@ -1,41 +1,71 @@
 import asyncio
-import itertools
+import hashlib
 import json
+import math
 import os
 import shutil
+import subprocess
 import threading
 import time
 import uuid
-from concurrent.futures import ThreadPoolExecutor
-from queue import Queue
+from concurrent.futures import as_completed
+from queue import Empty, Queue
 from typing import List, Tuple
 
+import numpy as np
 import uvicorn
-from fastapi import FastAPI, UploadFile, File, Form
+from fastapi import FastAPI, UploadFile, File, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.responses import StreamingResponse, JSONResponse, FileResponse
 from tqdm import tqdm
 
 from Config.ProcessingContext import ProcessingContext
 from Config.TranscriptionConfig import TranscriptionConfig
 from TranscriptionComponents.logger import Logger
-from TranscriptionComponents.audio_processing import prepare_audio, get_video_duration, segment_audio, create_segment_jobs, cut_audio_segment
-from TranscriptionComponents.transcription_utils import transcribe_segment
-from TranscriptionComponents.model_loading import load_whisper_model, load_translation_model
+from TranscriptionComponents.audio_processing import prepare_audio, load_audio_from_video, load_audio_from_stream, iter_prepared_audio_blocks, IncrementalSegmenter, get_audio_duration, segment_audio, cut_audio_segment
+from TranscriptionComponents.transcription_utils import transcribe_segment, transcribe_segments_batched, iter_job_batches
+from TranscriptionComponents.job_planner import (
+    plan_segment_jobs, choose_target_length, merge_streamed_jobs, describe_job_lengths, MAX_JOB_SECONDS)
+from TranscriptionComponents.model_registry import ModelRegistry
 from TranscriptionComponents.network_utils import is_port_available
+from TranscriptionComponents.process_pool import WhisperProcessPool, SharedAudioBuffer, balance_by_duration
+from TranscriptionComponents.profiling import TaskProfiler, profile_path, worker_profile_prefix
+from TranscriptionComponents.scheduler import TranscriptionScheduler, SchedulerFullError
+from TranscriptionComponents.segment_ordering import SegmentReorderBuffer
+from TranscriptionComponents.result_cache import ResultCache
+from TranscriptionComponents.result_channel import ResultChannel
+from TranscriptionComponents.body_stream import BodyStreamReader
+from TranscriptionComponents.translation_cache import TranslationCache, normalize_source_text
 
 
 class TranscriptionServer:
-    def __init__(self, host: str = "0.0.0.0", port: int = 8000):
-        """Initialize the TranscriptionServer."""
+    def __init__(self, host: str = "0.0.0.0", port: int = 8000, preload_models=("small",),
+                 model_memory_budget_mb: float = 4096, worker_budget: int = None,
+                 max_active_tasks: int = 2, max_queue_depth: int = 16, profile_tasks: bool = False,
+                 local_video_roots=()):
+        """Initialize the TranscriptionServer.
+
+        worker_budget caps segment workers across all tasks (default: CPU
+        count); max_active_tasks and max_queue_depth bound how many uploads
+        run and wait before new ones are turned away with 429. profile_tasks
+        profiles every task, as if each request had set `profile`.
+        local_video_roots lists directories whose videos remote clients may
+        reference by `video_path`; loopback clients may reference any file.
+        """
         self.host = host
         self.port = port
+        self.local_video_roots = [os.path.realpath(root) for root in local_video_roots]
         self.app = FastAPI(title="Video Transcription Streaming API")
         self.logger = Logger(log_file="transcription_server_log.txt")
         self.segment_queues = {}
-        self.model_cache = {}
-        self.nmt_model = None
-        self.tokenizer = None
+        self.preload_models = preload_models
+        self.models = ModelRegistry(
+            self.logger, memory_budget_mb=model_memory_budget_mb)
+        self.profile_tasks = profile_tasks
+        self.translation_cache = TranslationCache()
+        self.result_cache = ResultCache()
+        self.scheduler = TranscriptionScheduler(
+            worker_budget, max_active_tasks, max_queue_depth)
         self.server_thread = None
         self.setup_middleware()
         self.setup_routes()
@@ -56,55 +86,162 @@ class TranscriptionServer:
         async def health_check():
             return JSONResponse(content={"status": "ok"}, status_code=200)
 
+        @self.app.get("/models")
+        async def model_stats():
+            return JSONResponse(content=self.models.stats(), status_code=200)
+
+        @self.app.get("/translation_cache")
+        async def translation_cache_stats():
+            return JSONResponse(content=self.translation_cache.stats(), status_code=200)
+
+        @self.app.get("/metrics")
+        async def pipeline_metrics():
+            return JSONResponse(content=self.logger.metrics.snapshot(), status_code=200)
+
+        @self.app.get("/scheduler")
+        async def scheduler_stats():
+            return JSONResponse(content=self.scheduler.stats(), status_code=200)
+
         @self.app.post("/transcribe/")
         async def transcribe_video_streaming(
-            file: UploadFile = File(...),
+            request: Request,
+            file: UploadFile = File(None),
+            video_path: str = Form(None),
             model_name: str = Form("small"),
             max_workers: int = Form(4),
             min_silence_duration: float = Form(0.7),
             silence_threshold: int = Form(-35),
-            language: bool = Form(False)
+            language: bool = Form(False),
+            in_memory: bool = Form(True),
+            skip_denoise: bool = Form(False),
+            translation_batch_size: int = Form(8),
+            translation_batch_timeout_ms: float = Form(50),
+            execution_mode: str = Form("thread"),
+            cpu_threads: int = Form(0),
+            num_workers: int = Form(1),
+            batch_size: int = Form(1),
+            beam_size: int = Form(5),
+            profile: bool = Form(False)
         ):
-            """Handle video transcription with streaming results."""
+            """Handle video transcription with streaming results.
+
+            Either upload the video as `file`, or pass `video_path` to a file
+            the server can read directly (same machine) to skip the upload.
+            """
+            if video_path is None and file is None:
+                return JSONResponse(content={"status": "error", "message": "Provide a file or a video_path."},
+                                    status_code=400)
+            if video_path is not None:
+                # Resolved, so ffmpeg sees a plain file path and never a protocol or link.
+                video_path = os.path.realpath(video_path)
+                if not self.local_video_allowed(request, video_path):
+                    return JSONResponse(content={"status": "error",
+                                                 "message": "video_path is not allowed for this client."},
+                                        status_code=403)
+                if not os.path.isfile(video_path):
+                    return JSONResponse(content={"status": "error", "message": f"Video not found: {video_path}"},
+                                        status_code=400)
+            if self.scheduler.is_full():
+                # Turn the client away before it costs an ingest.
+                return self.queue_full_response(SchedulerFullError())
+
             task_id = str(uuid.uuid4())
             output_folder = f"temp/{task_id}"
             os.makedirs(output_folder, exist_ok=True)
-            temp_file_path = f"{output_folder}/input_video.mp4"
 
-            with open(temp_file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
+            config = self.make_config(
+                model_name, max_workers, min_silence_duration, silence_threshold, in_memory, skip_denoise,
+                translation_batch_size=translation_batch_size,
+                translation_batch_timeout_ms=translation_batch_timeout_ms,
+                execution_mode=execution_mode, cpu_threads=cpu_threads, num_workers=num_workers,
+                batch_size=batch_size, beam_size=beam_size)
+            if video_path is not None:
+                # Referenced in place: no copy, and a cheap fingerprint as cache address.
+                context = ProcessingContext(task_id, video_path, output_folder)
+                context.file_hash = self.fingerprint_local_video(video_path)
+            else:
+                # Multipart uploads are spooled by the framework before this runs;
+                # use /transcribe/stream to decode while the upload is arriving.
+                context = ProcessingContext(
+                    task_id, f"{output_folder}/input_video.mp4", output_folder)
+                await asyncio.to_thread(self.ingest_stream, file.file, context, config)
+            return self.start_task(context, config, language, profile)
+
+        @self.app.post("/transcribe/stream")
+        async def transcribe_body_streaming(
+            request: Request,
+            model_name: str = "small",
+            max_workers: int = 4,
+            min_silence_duration: float = 0.7,
+            silence_threshold: int = -35,
+            language: bool = False,
+            in_memory: bool = True,
+            skip_denoise: bool = False,
+            translation_batch_size: int = 8,
+            translation_batch_timeout_ms: float = 50,
+            execution_mode: str = "thread",
+            cpu_threads: int = 0,
+            num_workers: int = 1,
+            batch_size: int = 1,
+            beam_size: int = 5,
+            profile: bool = False
+        ):
+            """Handle video transcription with streaming results, the video being the raw request body.
 
-            self.segment_queues[task_id] = Queue()
-            config = TranscriptionConfig(
-                model_name, max_workers, min_silence_duration, silence_threshold)
-            context = ProcessingContext(task_id, temp_file_path, output_folder)
+            Takes the same settings as /transcribe/, as query parameters. The
+            audio is decoded while the body is still arriving, instead of
+            after the whole upload has been received.
+            """
+            if self.scheduler.is_full():
+                return self.queue_full_response(SchedulerFullError())
 
-            background_thread = threading.Thread(
-                target=self.process_video_with_streaming,
-                args=(context, config, language)
-            )
-            background_thread.daemon = True
-            background_thread.start()
+            task_id = str(uuid.uuid4())
+            output_folder = f"temp/{task_id}"
+            os.makedirs(output_folder, exist_ok=True)
 
-            async def stream_transcription_results():
-                queue = self.segment_queues[task_id]
+            config = self.make_config(
+                model_name, max_workers, min_silence_duration, silence_threshold, in_memory, skip_denoise,
+                translation_batch_size=translation_batch_size,
+                translation_batch_timeout_ms=translation_batch_timeout_ms,
+                execution_mode=execution_mode, cpu_threads=cpu_threads, num_workers=num_workers,
+                batch_size=batch_size, beam_size=beam_size)
+            context = ProcessingContext(
+                task_id, f"{output_folder}/input_video.mp4", output_folder)
+            body = BodyStreamReader(asyncio.get_running_loop())
+
+            def ingest_body():
                 try:
-                    while True:
-                        try:
-                            result = queue.get(block=True, timeout=0.1)
-                            if result == "DONE":
-                                break
-                            yield json.dumps(result) + "\n"
-                        except Exception:
-                            await asyncio.sleep(0.1)
+                    self.ingest_stream(body, context, config)
                 finally:
-                    if task_id in self.segment_queues:
-                        del self.segment_queues[task_id]
-
-            return StreamingResponse(
-                stream_transcription_results(),
-                media_type="application/json"
-            )
+                    # Unblocks the receive loop below if ingest stops early.
+                    body.close()
+
+            ingest = asyncio.ensure_future(asyncio.to_thread(ingest_body))
+            try:
+                async for chunk in request.stream():
+                    await body.feed(chunk)
+                await body.end()
+            except Exception:
+                # The client went away mid-upload.
+                body.close()
+                await asyncio.gather(ingest, return_exceptions=True)
+                shutil.rmtree(output_folder, ignore_errors=True)
+                raise
+            await ingest
+            return self.start_task(context, config, language, profile)
+
+        @self.app.get("/profiles/{task_id}")
+        async def download_profile(task_id: str):
+            """Download the cProfile stats of a task run with `profile` (load with pstats)."""
+            try:
+                path = profile_path(str(uuid.UUID(task_id)))
+            except ValueError:
+                path = None
+            if path is None or not os.path.exists(path):
+                return JSONResponse(content={"status": "error", "message": "Profile not found"},
+                                    status_code=404)
+            return FileResponse(path, media_type="application/octet-stream",
+                                filename=f"{task_id}.prof")
 
         @self.app.delete("/cleanup/{task_id}")
         async def cleanup_task(task_id: str):
@@ -122,154 +259,549 @@ class TranscriptionServer:
         async def startup_event():
             """Perform startup tasks."""
             os.makedirs("temp", exist_ok=True)
-            self.nmt_model, self.tokenizer = load_translation_model()
+            # No-op on first start; after stop() they bring the workers back.
+            self.logger.start()
+            self.scheduler.start()
+            # MarianMT is loaded lazily by the first request that needs Arabic.
+            self.models.preload(self.preload_models)
+            self.models.start_idle_sweep()
+
+    def make_config(self, model_name: str, max_workers: int, min_silence_duration: float,
+                    silence_threshold: int, in_memory: bool, skip_denoise: bool, cpu_threads: int = 0,
+                    num_workers: int = 1, **options) -> TranscriptionConfig:
+        """TranscriptionConfig for a request; worker counts come from the client, bounded by the server's budget."""
+        max_workers = max(1, min(max_workers, self.scheduler.worker_budget))
+        cpu_threads = max(0, min(cpu_threads, os.cpu_count() or 1))
+        num_workers = max(1, min(num_workers, self.scheduler.worker_budget))
+        return TranscriptionConfig(
+            model_name, max_workers, min_silence_duration, silence_threshold, in_memory, skip_denoise,
+            cpu_threads=cpu_threads, num_workers=num_workers, **options)
+
+    def start_task(self, context: ProcessingContext, config: TranscriptionConfig, language: bool,
+                   profile: bool):
+        """Replay cached results or schedule the task, and stream its results back."""
+        task_id = context.task_id
+        self.segment_queues[task_id] = ResultChannel(asyncio.get_running_loop())
+        if profile or self.profile_tasks:
+            context.profiler = TaskProfiler(task_id)
+
+        cached_results = self.result_cache.load_results(
+            ResultCache.result_key(context.file_hash, config, language))
+        if cached_results is not None:
+            # Byte-identical video with identical settings: replay it.
+            for result in cached_results:
+                self.segment_queues[task_id].put(result)
+            self.segment_queues[task_id].put({"status": "completed", "failed": False})
+            self.segment_queues[task_id].put("DONE")
+            shutil.rmtree(context.output_folder, ignore_errors=True)
+        else:
+            def run():
+                self.process_video_with_streaming(context, config, language)
+            if context.profiler is not None:
+                run = context.profiler.profile_task(run)
+            try:
+                self.scheduler.submit_task(
+                    task_id, run, self.segment_queues[task_id].put)
+            except SchedulerFullError as e:
+                del self.segment_queues[task_id]
+                shutil.rmtree(context.output_folder, ignore_errors=True)
+                return self.queue_full_response(e)
+
+        async def stream_transcription_results():
+            channel = self.segment_queues[task_id]
+            completed = False
+            try:
+                while True:
+                    result = await channel.get()
+                    if result == "DONE":
+                        completed = True
+                        break
+                    yield json.dumps(result) + "\n"
+            finally:
+                # Runs when the client disconnects too: stop the work it no longer wants.
+                if not completed:
+                    self.cancel_task(context)
+                if task_id in self.segment_queues:
+                    del self.segment_queues[task_id]
+
+        return StreamingResponse(
+            stream_transcription_results(),
+            media_type="application/json",
+            headers={"X-Task-Id": task_id}
+        )
 
-    def prepare_audio_files(self, context: ProcessingContext):
-        """Prepare audio files for transcription."""
+    def profiled(self, context: ProcessingContext, fn):
+        """`fn` as is, or wrapped to run under the task's profiler when it has one."""
+        if context.profiler is None:
+            return fn
+        return context.profiler.wrap(fn)
+
+    def cancel_task(self, context: ProcessingContext):
+        """Cancel a task whose client has gone away and free what it holds."""
+        context.cancelled.set()
+        if self.scheduler.cancel_task(context.task_id):
+            # It never started, so no worker will clean up after it.
+            shutil.rmtree(context.output_folder, ignore_errors=True)
+        self.logger.log_step("Cancel Task", 0.0, f"Task: {context.task_id}")
+
+    def queue_full_response(self, error: SchedulerFullError) -> JSONResponse:
+        retry_after = error.retry_after_seconds or 30
+        return JSONResponse(content={"status": "error", "message": str(error),
+                                     "retry_after_seconds": retry_after},
+                            status_code=429, headers={"Retry-After": str(int(math.ceil(retry_after)))})
+
+    def local_video_allowed(self, request: Request, video_path: str) -> bool:
+        """Whether the client may have the server read `video_path` (already resolved) from its disk."""
+        if request.client is not None and request.client.host in ("127.0.0.1", "::1", "::ffff:127.0.0.1"):
+            return True
+        for root in self.local_video_roots:
+            try:
+                if os.path.commonpath([video_path, root]) == root:
+                    return True
+            except ValueError:
+                # Different drives on Windows.
+                continue
+        return False
+
+    def fingerprint_local_video(self, video_path: str) -> str:
+        """Cache address for a video referenced by path: its location, size and modification time."""
+        stat = os.stat(video_path)
+        return hashlib.sha256(
+            f"{os.path.abspath(video_path)}|{stat.st_size}|{stat.st_mtime_ns}".encode("utf-8")).hexdigest()
+
+    def ingest_stream(self, stream, context: ProcessingContext, config: TranscriptionConfig):
+        """Copy an incoming video to context.video_path and hash it, reading it once.
+
+        In in-memory mode the same pass pipes it through ffmpeg's stdin, so
+        the audio is decoded as it arrives. When ffmpeg cannot decode the
+        container from a pipe, context.raw_audio stays unset and the audio is
+        decoded from the copy later.
+        """
         start_time = time.time()
+        hasher = hashlib.sha256()
+        mode = "copy"
+        with open(context.video_path, "wb") as buffer:
+            def on_chunk(chunk):
+                hasher.update(chunk)
+                buffer.write(chunk)
+
+            if config.in_memory:
+                try:
+                    context.raw_audio, context.sample_rate = load_audio_from_stream(
+                        stream, self.logger, on_chunk=on_chunk)
+                    mode = "stream"
+                except subprocess.CalledProcessError:
+                    print("[WARNING] Streaming decode failed, decoding from the copied upload instead.")
+            # Whatever the decoder did not consume; all of it in WAV-file mode.
+            while True:
+                chunk = stream.read(1024 * 1024)
+                if not chunk:
+                    break
+                on_chunk(chunk)
+        context.file_hash = hasher.hexdigest()
+        self.logger.log_step("Ingest Upload", time.time() - start_time,
+                             f"Task: {context.task_id}, Mode: {mode}")
+
+    def prepare_audio_files(self, context: ProcessingContext, config: TranscriptionConfig):
+        """Prepare audio files for transcription."""
         prepare_audio(context.video_path, context.raw_audio_path,
-                      context.cleaned_audio_path, self.logger)
-        elapsed_time = time.time() - start_time
-        self.logger.log_step("Prepare Audio", elapsed_time)
+                      context.cleaned_audio_path, self.logger,
+                      config.skip_denoise, config.denoise_chunk_seconds)
 
     def load_transcription_model(self, config: TranscriptionConfig):
-        """Load the Whisper model for transcription."""
+        """Load the Whisper model for transcription, or the process pool that holds one per worker.
+
+        A process pool is leased to the task and must be released when it ends.
+        """
         start_time = time.time()
-        model = load_whisper_model(config.model_name)
+        if config.execution_mode == "process":
+            # The request's split, already capped at the server's budget.
+            model = self.models.get_process_pool(
+                config.model_name, config.max_workers, config.cpu_threads, config.num_workers)
+        else:
+            model = self.models.get_whisper(
+                config.model_name, config.cpu_threads, config.num_workers)
         elapsed_time = time.time() - start_time
         self.logger.log_step("Load Whisper Model", elapsed_time)
         return model
 
     def segment_audio_file(self, context: ProcessingContext, config: TranscriptionConfig) -> List[Tuple[float, float]]:
         """Segment audio based on silence detection."""
-        start_time = time.time()
+        audio = context.audio if context.audio is not None else context.cleaned_audio_path
         silent_points = segment_audio(
-            context.cleaned_audio_path,
-            context.video_path,
+            audio,
             config.min_silence_duration,
             config.silence_threshold,
-            self.logger
+            self.logger,
+            sr=context.sample_rate
         )
-        elapsed_time = time.time() - start_time
-        self.logger.log_step("Segment Audio", elapsed_time)
         return silent_points
 
-    def create_jobs(self, context: ProcessingContext, silent_points: List[Tuple[float, float]]) -> List[Tuple[float, float, int]]:
-        """Create segment jobs for transcription."""
+    def create_jobs(self, context: ProcessingContext, config: TranscriptionConfig,
+                    silent_points: List[float]) -> List[Tuple[float, float, int]]:
+        """Plan segment jobs of about Whisper's window, balanced across the task's workers."""
+        audio = context.audio if context.audio is not None else context.cleaned_audio_path
+        video_duration = get_audio_duration(audio, context.sample_rate)
+        return plan_segment_jobs(silent_points, video_duration, audio, context.sample_rate,
+                                 self.logger, config.max_workers)
+
+    def stream_segment_jobs(self, context: ProcessingContext, config: TranscriptionConfig):
+        """Yield segment jobs while the rest of the audio is still being denoised and analysed."""
         start_time = time.time()
-        video_duration = get_video_duration(context.video_path)
-        jobs = create_segment_jobs(silent_points, video_duration, self.logger)
+        if context.raw_audio is not None:
+            raw_audio, sr = context.raw_audio, context.sample_rate
+            context.raw_audio = None
+        else:
+            raw_audio, sr = load_audio_from_video(
+                context.video_path, self.logger)
+        context.sample_rate = sr
+        if config.execution_mode == "process":
+            context.shared_audio = SharedAudioBuffer(len(raw_audio))
+            context.audio = context.shared_audio.array
+        else:
+            context.audio = raw_audio if config.skip_denoise else np.empty_like(
+                raw_audio)
+        segmenter = IncrementalSegmenter(
+            sr, config.min_silence_duration, config.silence_threshold, MAX_JOB_SECONDS)
+
+        def silence_jobs():
+            for start, block in iter_prepared_audio_blocks(
+                    raw_audio, sr, self.logger, config.skip_denoise, config.denoise_chunk_seconds):
+                if context.audio is not raw_audio:
+                    context.audio[start:start + len(block)] = block
+                yield from segmenter.feed(block)
+            yield from segmenter.finish()
+
+        # Silence-split jobs are merged up to a length that keeps every worker busy.
+        target = choose_target_length(len(raw_audio) / sr, config.max_workers)
+        jobs = []
+        for job in merge_streamed_jobs(silence_jobs(), target):
+            jobs.append(job)
+            yield job
         elapsed_time = time.time() - start_time
-        self.logger.log_step("Create Segment Jobs", elapsed_time)
+        self.logger.log_step("Stream Segment Jobs", elapsed_time,
+                             f"Target: {target:.1f}s, {describe_job_lengths(jobs)}, "
+                             f"Duration: {len(raw_audio) / sr:.2f}s")
+
+    def load_cached_audio(self, context: ProcessingContext, config: TranscriptionConfig):
+        """Reuse cleaned audio and segment jobs from an earlier run of the same video, if any."""
+        cached = self.result_cache.load_audio(
+            ResultCache.audio_key(context.file_hash, config))
+        if cached is None:
+            return None
+        context.audio, context.sample_rate, jobs = cached
+        if config.execution_mode == "process":
+            context.shared_audio = SharedAudioBuffer(len(context.audio))
+            context.shared_audio.array[:] = context.audio
+            context.audio = context.shared_audio.array
+        self.logger.log_step("Load Cached Audio", 0.0,
+                             f"Task: {context.task_id}, Jobs: {len(jobs)}")
         return jobs
 
-    def translate_segment(self, segment: dict) -> dict:
-        """Translate a segment to Arabic."""
+    def store_cached_artifacts(self, context: ProcessingContext, config: TranscriptionConfig, language: bool,
+                               jobs: List[Tuple[float, float, int]], audio_from_cache: bool):
+        """Save the finished results, and the intermediates they were built from, to the result cache.
+
+        Results with a failed segment or translation are not stored, so a
+        transient error is not replayed to later requests.
+        """
+        start_time = time.time()
         try:
-            translated = self.nmt_model.generate(
-                **self.tokenizer(
-                    segment["text"],
-                    return_tensors="pt",
-                    padding=True,
-                    truncation=True
-                ).to(self.nmt_model.device)
-            )
-            translated_text = self.tokenizer.decode(
-                translated[0], skip_special_tokens=True)
-            return {**segment, "text": translated_text}
+            if not context.failed:
+                self.result_cache.store_results(
+                    ResultCache.result_key(context.file_hash, config, language), context.results)
+            if context.audio is not None and not audio_from_cache:
+                self.result_cache.store_audio(
+                    ResultCache.audio_key(context.file_hash, config),
+                    context.audio, context.sample_rate, sorted(jobs, key=lambda job: job[2]))
         except Exception as e:
-            print(
-                f"Translation failed for segment {segment.get('index PRF: 2')}")
-            return {**segment, "text": "[Translation Error]"}
-
-    def translation_worker(self, translation_queue: Queue, context: ProcessingContext, language: bool):
-        """Worker thread for translating segments to Arabic."""
-        while True:
-            segment_to_translate = translation_queue.get()
-            if segment_to_translate is ...:  # Stop signal
+            print(f"Failed to store cached results: {e}")
+        elapsed_time = time.time() - start_time
+        self.logger.log_step("Store Cached Results", elapsed_time,
+                             f"Task: {context.task_id}, Results: {len(context.results)}, "
+                             f"Stored: {not context.failed}")
+
+    def translate_segments(self, segments: List[dict], context: ProcessingContext = None) -> List[dict]:
+        """Translate a batch of segments to Arabic, consulting the translation cache first.
+
+        Segments that could not be translated get "[Translation Error]" and
+        mark `context` as failed.
+        """
+        start_time = time.time()
+        model_id = ModelRegistry.TRANSLATOR_KEY[0]
+        texts = [normalize_source_text(segment["text"]) for segment in segments]
+        translations = self.translation_cache.get_many(model_id, texts)
+        missing = list(dict.fromkeys(
+            text for text, translation in zip(texts, translations) if translation is None))
+        if missing:
+            fresh = {}
+            try:
+                nmt_model, tokenizer = self.models.get_translator()
+                translated = nmt_model.generate(
+                    **tokenizer(
+                        missing,
+                        return_tensors="pt",
+                        padding=True,
+                        truncation=True
+                    ).to(nmt_model.device)
+                )
+                translated_texts = tokenizer.batch_decode(
+                    translated, skip_special_tokens=True)
+                self.translation_cache.put_many(
+                    model_id, missing, translated_texts)
+                fresh = dict(zip(missing, translated_texts))
+            except Exception as e:
+                print(
+                    f"Translation failed for segments {[segment.get('index') for segment in segments]}: {e}")
+                if context is not None:
+                    context.failed = True
+            translations = [
+                translation if translation is not None else fresh.get(
+                    text, "[Translation Error]")
+                for text, translation in zip(texts, translations)
+            ]
+        self.logger.log_step("Translate Segments", time.time() - start_time,
+                             f"Segments: {len(segments)}, Translated: {len(missing)}")
+        return [{**segment, "text": translation} for segment, translation in zip(segments, translations)]
+
+    def collect_translation_batch(self, translation_queue: Queue, batch_size: int, timeout_ms: float):
+        """Wait for one segment, then gather more until the batch is full or the deadline passes.
+
+        Returns (batch, stop) where stop is True once the stop signal was seen.
+        """
+        first = translation_queue.get()
+        if first is ...:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + timeout_ms / 1000
+        while len(batch) < batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = translation_queue.get(timeout=remaining)
+            except Empty:
                 break
+            if item is ...:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def translation_worker(self, translation_queue: Queue, context: ProcessingContext, config: TranscriptionConfig, language: bool):
+        """Worker thread for translating segments to Arabic in micro-batches.
+
+        Without translation, segments are delivered as soon as they are in
+        order; there is nothing to batch, so no batching deadline applies.
+        """
+        stop = False
+        while not stop:
             if language:
-                translated_segment = self.translate_segment(
-                    segment_to_translate)
-                text = translated_segment["text"]
+                batch, stop = self.collect_translation_batch(
+                    translation_queue, config.translation_batch_size, config.translation_batch_timeout_ms)
             else:
-                text = segment_to_translate["text"]
-
-            index = segment_to_translate["index"]
-            result = {
-                "segment_index": index,
-                "start_time": segment_to_translate["start"],
-                "end_time": segment_to_translate["end"],
-                "text": text
-            }
-            self.segment_queues[context.task_id].put(result)
-
-    def process_segment(self, job: Tuple[float, float, int], model, context: ProcessingContext, translation_queue: Queue):
+                segment = translation_queue.get()
+                stop = segment is ...
+                batch = [] if stop else [segment]
+            if not batch or context.cancelled.is_set():
+                continue
+            if language:
+                batch = self.translate_segments(batch, context)
+
+            for segment in batch:
+                result = {
+                    "segment_index": segment["index"],
+                    "start_time": segment["start"],
+                    "end_time": segment["end"],
+                    "text": segment["text"]
+                }
+                context.results.append(result)
+                self.logger.metrics.segment_emitted(context.task_id)
+                channel = self.segment_queues.get(context.task_id)
+                if channel is not None:
+                    channel.put(result)
+
+    def process_segment(self, job: Tuple[float, float, int], model, context: ProcessingContext,
+                        config: TranscriptionConfig, reorder_buffer: SegmentReorderBuffer):
         """Process a single audio segment."""
         start_time_segment = time.time()
         start_time, end_time, segment_idx = job
-        temp_audio_file = os.path.join(
-            context.output_folder, f"segment_{segment_idx}_audio.wav")
+        if context.cancelled.is_set():
+            # Still report, so the reorder buffer never waits on a dropped job.
+            reorder_buffer.put(segment_idx, [])
+            return
+        adjusted_segments = []
         try:
-            cut_audio_segment(context.cleaned_audio_path,
-                              temp_audio_file, start_time, end_time, self.logger)
-            adjusted_segments = transcribe_segment(
-                model, temp_audio_file, start_time, end_time)
-            for segment in adjusted_segments:
-                index = next(itertools.count(1))
-                segment_with_index = {**segment, "index": index}
-                translation_queue.put(segment_with_index)
+            if isinstance(model, WhisperProcessPool):
+                profile_prefix = None
+                if context.profiler is not None:
+                    profile_prefix = worker_profile_prefix(context.task_id)
+                adjusted_segments = model.transcribe(
+                    context.shared_audio, context.sample_rate, job, config.beam_size, profile_prefix)
+            else:
+                if context.audio is not None:
+                    # Basic slicing gives a view into the shared buffer, no copy.
+                    sr = context.sample_rate
+                    segment_audio_data = context.audio[int(
+                        start_time * sr):int(end_time * sr)]
+                else:
+                    segment_audio_data = cut_audio_segment(
+                        context.cleaned_audio_path, start_time, end_time, self.logger)
+                adjusted_segments = transcribe_segment(
+                    model, segment_audio_data, start_time, end_time, config.beam_size)
         except Exception as e:
+            context.failed = True
             print(f"Error processing segment {segment_idx}: {str(e)}")
         finally:
-            if os.path.exists(temp_audio_file):
-                try:
-                    os.remove(temp_audio_file)
-                except:
-                    pass
+            # Always report, even empty, so later jobs are not held back.
+            reorder_buffer.put(segment_idx, adjusted_segments)
             elapsed_time_segment = time.time() - start_time_segment
             self.logger.log_step(
-                f"Process Segment {segment_idx}",
+                "Process Segment",
                 elapsed_time_segment,
-                additional_info=f"Start Time: {start_time:.2f}s, End Time: {end_time:.2f}s"
+                additional_info=f"Segment: {segment_idx}, Start Time: {start_time:.2f}s, End Time: {end_time:.2f}s"
+            )
+
+    def process_segment_batch(self, jobs: List[Tuple[float, float, int]], model, context: ProcessingContext,
+                              config: TranscriptionConfig, reorder_buffer: SegmentReorderBuffer):
+        """Transcribe several short in-memory segments in one batched encoder pass."""
+        if context.cancelled.is_set():
+            for job in jobs:
+                reorder_buffer.put(job[2], [])
+            return
+        start_time_batch = time.time()
+        results = {}
+        try:
+            results = transcribe_segments_batched(
+                model, context.audio, context.sample_rate, jobs, config.batch_size, config.beam_size)
+        except Exception as e:
+            context.failed = True
+            print(
+                f"Error processing segment batch {[job[2] for job in jobs]}: {str(e)}")
+        finally:
+            for job in jobs:
+                reorder_buffer.put(job[2], results.get(job[2], []))
+            elapsed_time_batch = time.time() - start_time_batch
+            self.logger.log_step(
+                "Process Segment Batch",
+                elapsed_time_batch,
+                additional_info=f"Segments: {jobs[0][2]}-{jobs[-1][2]}, Jobs: {len(jobs)}, "
+                                f"Start Time: {jobs[0][0]:.2f}s, End Time: {jobs[-1][1]:.2f}s"
             )
 
     def process_video_with_streaming(self, context: ProcessingContext, config: TranscriptionConfig, language: bool):
         """Process video with streaming transcription and translation."""
+        metrics = self.logger.metrics
+        metrics.start_task(context.task_id)
+        status = "failed"
+        submitted_jobs = []
+        model = None
         try:
-            self.prepare_audio_files(context)
+            stage_start = time.time()
             model = self.load_transcription_model(config)
-            silent_points = self.segment_audio_file(context, config)
-            jobs = self.create_jobs(context, silent_points)
+            metrics.record_span(context.task_id, "Task Load Model",
+                                stage_start, time.time() - stage_start)
 
             translation_queue = Queue()
             stop_signal = ...
 
             translator_thread = threading.Thread(
-                target=self.translation_worker,
-                args=(translation_queue, context, language)
+                target=self.profiled(context, self.translation_worker),
+                args=(translation_queue, context, config, language)
             )
             translator_thread.daemon = True
             translator_thread.start()
 
-            with ThreadPoolExecutor(max_workers=config.max_workers) as executor:
-                list(tqdm(
-                    executor.map(lambda job: self.process_segment(
-                        job, model, context, translation_queue), jobs),
-                    total=len(jobs),
-                    desc="Transcribing segments"
-                ))
-
+            reorder_buffer = SegmentReorderBuffer(
+                translation_queue, config.reorder_window)
+
+            stage_start = time.time()
+            with self.scheduler.executor(context.task_id, config.max_workers) as executor:
+                audio_from_cache = False
+                if config.in_memory:
+                    jobs = self.load_cached_audio(context, config)
+                    audio_from_cache = jobs is not None
+                    if not audio_from_cache:
+                        # Jobs are submitted as soon as each silence is confirmed.
+                        jobs = self.stream_segment_jobs(context, config)
+                else:
+                    self.prepare_audio_files(context, config)
+                    silent_points = self.segment_audio_file(context, config)
+                    jobs = self.create_jobs(context, config, silent_points)
+                if config.execution_mode == "process":
+                    jobs = balance_by_duration(jobs, config.max_workers)
+                if config.batch_size > 1 and config.execution_mode == "thread" and config.in_memory:
+                    units = iter_job_batches(jobs, config.batch_size)
+                else:
+                    units = ([job] for job in jobs)
+                futures = []
+                for unit in units:
+                    # A shut-down scheduler cancels every unit; stop feeding it.
+                    if context.cancelled.is_set() or not self.scheduler.is_running():
+                        break
+                    submitted_jobs.extend(unit)
+                    reorder_buffer.wait_for_slot(max(job[2] for job in unit))
+                    if len(unit) == 1:
+                        future = executor.submit(
+                            self.profiled(context, self.process_segment),
+                            unit[0], model, context, config, reorder_buffer)
+                    else:
+                        future = executor.submit(
+                            self.profiled(context, self.process_segment_batch),
+                            unit, model, context, config, reorder_buffer)
+                    reorder_buffer.track(future, [job[2] for job in unit])
+                    futures.append(future)
+                for future in tqdm(as_completed(futures), total=len(futures), desc="Transcribing segments"):
+                    future.result()
+            metrics.record_span(context.task_id, "Task Transcribe",
+                                stage_start, time.time() - stage_start)
+
+            stage_start = time.time()
             translation_queue.put(stop_signal)
             translator_thread.join()
+            metrics.record_span(context.task_id, "Task Translation Drain",
+                                stage_start, time.time() - stage_start)
+            if context.cancelled.is_set():
+                status = "cancelled"
+                print(f"Task {context.task_id} cancelled by the client")
+                return
+            status = "completed"
+            # Tells the client whether the transcript has gaps from failed segments.
+            self.segment_queues[context.task_id].put(
+                {"status": "completed", "failed": context.failed})
             self.segment_queues[context.task_id].put("DONE")
+            self.store_cached_artifacts(
+                context, config, language, submitted_jobs, audio_from_cache)
 
         except Exception as e:
             print(f"Error in video processing: {e}")
-            if context.task_id in self.segment_queues:
-                self.segment_queues[context.task_id].put(
-                    {"status": "error", "message": str(e)})
-                self.segment_queues[context.task_id].put("DONE")
+            channel = self.segment_queues.get(context.task_id)
+            if channel is not None:
+                channel.put({"status": "error", "message": str(e)})
+                channel.put("DONE")
+        finally:
+            if context.shared_audio is not None:
+                if isinstance(model, WhisperProcessPool):
+                    profile_prefix = None
+                    if context.profiler is not None:
+                        profile_prefix = worker_profile_prefix(context.task_id)
+                    try:
+                        model.finish_task(context.shared_audio, profile_prefix)
+                    except Exception as e:
+                        print(f"[ERROR] Could not release task audio in pool workers: {e}")
+                context.audio = None
+                context.shared_audio.close()
+                context.shared_audio = None
+            if isinstance(model, WhisperProcessPool):
+                model.release()
+            # A model this task was the last user of may now be over budget or idle.
+            self.models.evict()
+            if context.cancelled.is_set():
+                shutil.rmtree(context.output_folder, ignore_errors=True)
+            task = metrics.finish_task(context.task_id, status,
+                                       max((job[1] for job in submitted_jobs), default=None))
+            self.logger.log_step("Transcription Task", task["wall_seconds"],
+                                 f"Task: {context.task_id}, Status: {status}, Segments: {task['segments']}, "
+                                 f"Audio: {task['audio_seconds']}s, RTF: {task['real_time_factor']}")
 
     def start(self):
         """Start the transcription server."""
@@ -293,6 +825,10 @@ class TranscriptionServer:
 
     def stop(self):
         """Stop the transcription server."""
+        self.models.close()
+        self.scheduler.shutdown()
+        # Last, so the lines logged while shutting down are written too.
+        self.logger.close()
         if self.server_thread and self.server_thread.is_alive():
             print("Stopping transcription server...")
             self.server_thread = None
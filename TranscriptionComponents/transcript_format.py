@@ -0,0 +1,131 @@
+import os
+import struct
+
+import numpy as np
+
+# File layout, little-endian:
+#   header   magic "GPTR", version u32, cue count n u64, text blob size u64
+#   starts   n x float64 seconds
+#   ends     n x float64 seconds
+#   offsets  (n + 1) x uint64 byte offsets of each cue's text in the blob
+#   blob     UTF-8 text of all cues, back to back
+# The header is 24 bytes, so every column stays 8-byte aligned for mapping.
+TRANSCRIPT_MAGIC = b"GPTR"
+TRANSCRIPT_VERSION = 1
+_HEADER = struct.Struct("<4sIQQ")
+
+
+class TranscriptTexts:
+    """Sequence view over the text blob; cues are decoded only when accessed."""
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.blob[int(self.offsets[i]):int(self.offsets[i + 1])].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class Transcript:
+    """A transcript loaded with load_transcript: memory-mapped columns plus lazily decoded text."""
+
+    def __init__(self, starts, ends, offsets, blob):
+        self.starts = starts
+        self.ends = ends
+        self.texts = TranscriptTexts(offsets, blob)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        # Bulk-convert once; per-element access to mapped arrays is slow.
+        offsets = self.texts.offsets.tolist()
+        blob = self.texts.blob.tobytes()
+        for i, (start, end) in enumerate(zip(self.starts.tolist(), self.ends.tolist())):
+            yield {"start": start, "end": end, "text": blob[offsets[i]:offsets[i + 1]].decode("utf-8")}
+
+
+def write_transcript(path, segments):
+    """Write segments ({"start", "end", "text"}) in the columnar format, atomically."""
+    segments = list(segments)
+    starts = np.array([segment["start"] for segment in segments], dtype="<f8")
+    ends = np.array([segment["end"] for segment in segments], dtype="<f8")
+    encoded = [segment["text"].strip().encode("utf-8") for segment in segments]
+    offsets = np.zeros(len(encoded) + 1, dtype="<u8")
+    np.cumsum([len(text) for text in encoded], out=offsets[1:])
+    blob = b"".join(encoded)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(TRANSCRIPT_MAGIC, TRANSCRIPT_VERSION, len(segments), len(blob)))
+        f.write(starts.tobytes())
+        f.write(ends.tobytes())
+        f.write(offsets.tobytes())
+        f.write(blob)
+    os.replace(tmp_path, path)
+
+
+def load_transcript(path) -> Transcript:
+    """Memory-map a transcript file; nothing but the header is read up front."""
+    data = np.memmap(path, dtype=np.uint8, mode="r")
+    if len(data) < _HEADER.size:
+        raise ValueError(f"Not a transcript file: {path}")
+    magic, version, count, blob_size = _HEADER.unpack(data[:_HEADER.size].tobytes())
+    if magic != TRANSCRIPT_MAGIC or version != TRANSCRIPT_VERSION:
+        raise ValueError(f"Unsupported transcript file: {path}")
+    column_bytes = count * 8
+    expected = _HEADER.size + 3 * column_bytes + 8 + blob_size
+    if len(data) != expected:
+        raise ValueError(
+            f"Truncated transcript file: {path} ({len(data)} of {expected} bytes)")
+    pos = _HEADER.size
+    starts = data[pos:pos + column_bytes].view("<f8")
+    pos += column_bytes
+    ends = data[pos:pos + column_bytes].view("<f8")
+    pos += column_bytes
+    offsets = data[pos:pos + column_bytes + 8].view("<u8")
+    pos += column_bytes + 8
+    return Transcript(starts, ends, offsets, data[pos:pos + blob_size])
+
+
+def format_timestamp(seconds, separator=","):
+    """HH:MM:SS,mmm for SRT; pass separator="." for WebVTT."""
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{milliseconds:03d}"
+
+
+def export_srt(segments, path):
+    """Write all segments as SRT in a single buffered write."""
+    cues = [
+        f"{index}\n{format_timestamp(segment['start'])} --> {format_timestamp(segment['end'])}\n"
+        f"{segment['text'].strip()}\n\n"
+        for index, segment in enumerate(segments, start=1)
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("".join(cues))
+
+
+def export_vtt(segments, path):
+    """Write all segments as WebVTT in a single buffered write."""
+    cues = [
+        f"{format_timestamp(segment['start'], '.')} --> {format_timestamp(segment['end'], '.')}\n"
+        f"{segment['text'].strip()}\n\n"
+        for segment in segments
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("WEBVTT\n\n" + "".join(cues))
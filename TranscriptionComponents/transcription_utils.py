@@ -1,38 +1,90 @@
-from faster_whisper import WhisperModel
-
-
-def transcribe_segment(model: WhisperModel, audio_file: str, start_time: float, end_time: float) -> list:
-    """Transcribe an audio segment using Faster Whisper."""
-    try:
-        segments, _ = model.transcribe(audio_file, language="en", beam_size=5)
-        adjusted_segments = []
-        for segment in segments:
-            segment_start = max(segment.start + start_time, start_time)
-            segment_end = min(segment.end + start_time, end_time)
-            if segment_start < segment_end:
-                adjusted_segments.append({
-                    "start": segment_start,
-                    "end": segment_end,
-                    "text": segment.text.strip()
-                })
-        return adjusted_segments
-    except Exception as e:
-        print(f"Error transcribing segment: {e}")
-        return []
-
-
-def write_srt_segment(segment, srt_path, index):
-    with open(srt_path, "a", encoding="utf-8") as f:
-        start = format_timestamp(segment['start'])
-        end = format_timestamp(segment['end'])
-        f.write(f"{index}\n")
-        f.write(f"{start} --> {end}\n")
-        f.write(f"{segment['text'].strip()}\n\n")
-
-
-def format_timestamp(seconds):
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    seconds = seconds % 60
-    milliseconds = int((seconds - int(seconds)) * 1000)
-    return f"{hours:02d}:{minutes:02d}:{int(seconds):02d},{milliseconds:03d}"
+from bisect import bisect_right
+
+from faster_whisper import WhisperModel, BatchedInferencePipeline
+
+# Whisper's input window; the batched pipeline truncates longer clips.
+WHISPER_WINDOW_SECONDS = 30.0
+
+
+def clamp_segment(segment_start: float, segment_end: float, text: str, start_time: float, end_time: float):
+    """Clip an absolute-time segment to its job's (start, end) range; None if nothing is left."""
+    segment_start = max(segment_start, start_time)
+    segment_end = min(segment_end, end_time)
+    if segment_start < segment_end:
+        return {
+            "start": segment_start,
+            "end": segment_end,
+            "text": text.strip()
+        }
+    return None
+
+
+def transcribe_segment(model: WhisperModel, audio, start_time: float, end_time: float, beam_size: int = 5) -> list:
+    """Transcribe an audio segment using Faster Whisper.
+
+    `audio` is either a path to a cut file or a 16 kHz float32 array slice.
+    Errors propagate, so the caller can tell a failed segment from a silent one.
+    """
+    segments, _ = model.transcribe(
+        audio, language="en", beam_size=beam_size)
+    adjusted_segments = []
+    for segment in segments:
+        adjusted = clamp_segment(segment.start + start_time, segment.end + start_time,
+                                 segment.text, start_time, end_time)
+        if adjusted:
+            adjusted_segments.append(adjusted)
+    return adjusted_segments
+
+
+def transcribe_segments_batched(model: WhisperModel, audio, sample_rate: int, jobs: list,
+                                batch_size: int = 8, beam_size: int = 5) -> dict:
+    """Transcribe several (start, end, idx) jobs of one audio buffer in encoder batches.
+
+    Every job must fit in Whisper's 30 s window. Returns {idx: segments}, with
+    segments clamped to their job's range as in `transcribe_segment`.
+    """
+    jobs = sorted(jobs)
+    results = {idx: [] for _, _, idx in jobs}
+    pipeline = BatchedInferencePipeline(model)
+    segments, _ = pipeline.transcribe(
+        audio,
+        language="en",
+        beam_size=beam_size,
+        batch_size=batch_size,
+        clip_timestamps=[{"start": start, "end": end}
+                         for start, end, _ in jobs],
+        without_timestamps=False,
+        vad_filter=False
+    )
+    job_starts = [start for start, _, _ in jobs]
+    for segment in segments:
+        # Batched segments are already in absolute time; find the clip by midpoint.
+        midpoint = (segment.start + segment.end) / 2
+        start_time, end_time, idx = jobs[max(
+            0, bisect_right(job_starts, midpoint) - 1)]
+        adjusted = clamp_segment(
+            segment.start, segment.end, segment.text, start_time, end_time)
+        if adjusted:
+            results[idx].append(adjusted)
+    return results
+
+
+def iter_job_batches(jobs, batch_size: int):
+    """Group consecutive jobs into lists of up to batch_size for `transcribe_segments_batched`.
+
+    Jobs longer than Whisper's window are yielded on their own.
+    """
+    batch = []
+    for job in jobs:
+        if job[1] - job[0] > WHISPER_WINDOW_SECONDS:
+            if batch:
+                yield batch
+                batch = []
+            yield [job]
+            continue
+        batch.append(job)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,111 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+
+def normalize_source_text(text: str) -> str:
+    """Canonical form used as the cache key: NFC, single spaces, trimmed."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class TranslationCache:
+    """LRU translation cache in memory, backed by a size-bounded SQLite table.
+
+    Entries are keyed on the translation model id and the normalized source
+    text. Safe to share between the translation threads of concurrent tasks.
+    """
+
+    def __init__(self, db_path: str = os.path.join("cache", "translations.sqlite3"),
+                 max_memory_entries: int = 10000, max_disk_entries: int = 200000):
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS translations "
+                "(key TEXT PRIMARY KEY, translation TEXT NOT NULL, last_used REAL NOT NULL)")
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)")
+            self._db.commit()
+            self._disk_entries = self._db.execute(
+                "SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    @staticmethod
+    def _disk_key(model_id: str, text: str) -> str:
+        return hashlib.sha1(f"{model_id}\0{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key, translation):
+        self._memory[key] = translation
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, model_id: str, texts: list) -> list:
+        """Return the cached translation for each normalized text, or None on a miss."""
+        results = []
+        now = time.time()
+        with self._lock:
+            for text in texts:
+                key = (model_id, text)
+                translation = self._memory.get(key)
+                if translation is not None:
+                    self._memory.move_to_end(key)
+                elif self._db is not None:
+                    disk_key = self._disk_key(model_id, text)
+                    row = self._db.execute(
+                        "SELECT translation FROM translations WHERE key = ?", (disk_key,)).fetchone()
+                    if row is not None:
+                        translation = row[0]
+                        self._db.execute(
+                            "UPDATE translations SET last_used = ? WHERE key = ?", (now, disk_key))
+                        self._remember(key, translation)
+                if translation is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                results.append(translation)
+            if self._db is not None:
+                self._db.commit()
+        return results
+
+    def put_many(self, model_id: str, texts: list, translations: list):
+        """Store translations for normalized texts, evicting the least recently used."""
+        now = time.time()
+        with self._lock:
+            for text, translation in zip(texts, translations):
+                self._remember((model_id, text), translation)
+            if self._db is None:
+                return
+            for text, translation in zip(texts, translations):
+                cursor = self._db.execute(
+                    "INSERT OR IGNORE INTO translations (key, translation, last_used) VALUES (?, ?, ?)",
+                    (self._disk_key(model_id, text), translation, now))
+                self._disk_entries += cursor.rowcount
+            overflow = self._disk_entries - self.max_disk_entries
+            if overflow > 0:
+                self._db.execute(
+                    "DELETE FROM translations WHERE key IN "
+                    "(SELECT key FROM translations ORDER BY last_used LIMIT ?)", (overflow,))
+                self._disk_entries -= overflow
+            self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": self._disk_entries if self._db is not None else 0,
+            }
@@ -2,9 +2,11 @@ from PySide6.QtCore import QThread, Signal
 import requests
 import os
 import json
-from filelock import FileLock
-from requests_toolbelt import MultipartEncoder, MultipartEncoderMonitor
+from urllib.parse import urlparse
+from requests_toolbelt import MultipartEncoder
 import time
+from transcript_store import TranscriptFileWriter, stored_transcript_path
+from TranscriptionComponents.transcript_format import write_transcript, export_srt
 
 
 class TranscriptionWorkerAPI(QThread):
@@ -12,6 +14,8 @@ class TranscriptionWorkerAPI(QThread):
     # Emitted when first segment transcription is done
     receive_first_segment = Signal(str)
     progress = Signal(str)   # Emitted as segments stream in
+    # Emitted per parsed segment: {"start", "end", "text"}
+    segment_received = Signal(dict)
     error = Signal(str)      # Emitted on any error
 
     def __init__(self, video_file, language, transcription_server):
@@ -21,9 +25,13 @@ class TranscriptionWorkerAPI(QThread):
         self.api_url = f"http://localhost:{transcription_server.port if transcription_server else 800}/transcribe/"
         self.translate = language
         self.transcript_filename = "transcription.txt"
-        self.lock = FileLock(self.transcript_filename + ".lock")
+        self.transcript_writer = None
+        self.segments = []
+        self.failed = False
+        self.completed = False
         self.is_first_segment = True
         self._is_running = True
+        self.response = None
         # Reference to TranscriptionServer instance
         self.transcription_server = transcription_server
 
@@ -56,78 +64,147 @@ class TranscriptionWorkerAPI(QThread):
             if os.path.exists(self.transcript_filename):
                 os.remove(self.transcript_filename)
                 print(f"{self.transcript_filename} has been deleted.")
-
-            with open(self.video_file, "rb") as f:
-                encoder = MultipartEncoder(
-                    fields={
-                        "file": (os.path.basename(self.video_file), f, "video/mp4"),
-                        "model_name": "small",
-                        "max_workers": "1",
-                        "min_silence_duration": "0.7",
-                        "silence_threshold": "-35",
-                        "language": str(self.translate).lower()
-                    }
-                )
-
-                def callback(monitor):
-                    if not self._is_running:
-                        monitor.abort()
-                    percent = int((monitor.bytes_read / monitor.len) * 100)
-                    self.progress.emit(f"Uploading: {percent}%")
-
-                monitor = MultipartEncoderMonitor(encoder, callback)
-                headers = {"Content-Type": monitor.content_type}
-
+            self.transcript_writer = TranscriptFileWriter(
+                self.transcript_filename)
+
+            fields = {
+                "model_name": "small",
+                "max_workers": "1",
+                "min_silence_duration": "0.7",
+                "silence_threshold": "-35",
+                "language": str(self.translate).lower()
+            }
+            # A server started by this app and reached over loopback shares
+            # our disk: hand it the path instead of uploading a copy of the
+            # video. The server only accepts paths from loopback clients.
+            local_server = self.transcription_server is not None and \
+                urlparse(self.api_url).hostname in ("localhost", "127.0.0.1", "::1")
+            if local_server:
+                fields["video_path"] = os.path.abspath(self.video_file)
+                encoder = MultipartEncoder(fields=fields)
                 response = requests.post(
                     self.api_url,
-                    data=monitor,
-                    headers=headers,
+                    data=encoder,
+                    headers={"Content-Type": encoder.content_type},
+                    stream=True,
+                    timeout=600
+                )
+            else:
+                # Sent as the raw body so the server decodes the audio
+                # while the video is still uploading.
+                response = requests.post(
+                    self.api_url + "stream",
+                    params=fields,
+                    data=self.read_video_chunks(),
+                    headers={"Content-Type": "application/octet-stream"},
                     stream=True,
                     timeout=600
                 )
+            self.response = response
 
-                if response.status_code != 200:
-                    self.error.emit(f"API Error: {response.text}")
-                    return
+            if response.status_code != 200:
+                self.error.emit(f"API Error: {response.text}")
+                return
 
-                for line in response.iter_lines():
-                    if not self._is_running:
-                        break
-                    if line:
-                        try:
-                            segment = json.loads(line)
-                            segment["start_time"] = round(
-                                segment.get("start_time", 0), 3)
-                            segment["end_time"] = round(
-                                segment.get("end_time", 0), 3)
-                            text = f"[{segment['start_time']} - {segment['end_time']}] {segment['text']}\n"
-
-                            with self.lock:
-                                with open(self.transcript_filename, "a", encoding="utf-8") as f:
-                                    f.write(text)
-                                    f.flush()
-                            if self.is_first_segment:
-                                self.receive_first_segment.emit(
-                                    "First Segment Received")
-                                self.is_first_segment = False
-
-                            self.progress.emit(text)
-                        except Exception as e:
-                            self.error.emit(f"Streaming decode error: {e}")
-
-            self.finished.emit("Transcription completed and saved.")
+            for line in response.iter_lines():
+                if not self._is_running:
+                    break
+                if line:
+                    try:
+                        segment = json.loads(line)
+                        if "status" in segment:
+                            self.handle_status(segment)
+                            continue
+                        segment["start_time"] = round(
+                            segment.get("start_time", 0), 3)
+                        segment["end_time"] = round(
+                            segment.get("end_time", 0), 3)
+                        text = f"[{segment['start_time']} - {segment['end_time']}] {segment['text']}\n"
+
+                        cue = {
+                            "start": segment["start_time"],
+                            "end": segment["end_time"],
+                            "text": segment["text"].strip()
+                        }
+                        self.segments.append(cue)
+                        self.segment_received.emit(cue)
+                        self.transcript_writer.write(text)
+                        if self.is_first_segment:
+                            self.receive_first_segment.emit(
+                                "First Segment Received")
+                            self.is_first_segment = False
+
+                        self.progress.emit(text)
+                    except Exception as e:
+                        self.error.emit(f"Streaming decode error: {e}")
+
+            if self._is_running:
+                # Only a complete, gap-free, non-empty run is worth reopening from disk.
+                if self.completed and not self.failed and self.segments:
+                    self.save_transcript()
+                self.finished.emit("Transcription completed and saved.")
 
         except Exception as e:
-            self.error.emit(f"Request failed: {str(e)}")
+            # Closing the response from stop() surfaces here as a read error.
+            if self._is_running:
+                self.error.emit(f"Request failed: {str(e)}")
         finally:
+            if self.transcript_writer is not None:
+                self.transcript_writer.close()
             # Stop the server if it was started
             if self.transcription_server:
                 self.transcription_server.stop()
 
+    def read_video_chunks(self, chunk_size=1024 * 1024):
+        """Yield the video for a streamed upload, reporting progress; stops early once stopped."""
+        total = os.path.getsize(self.video_file)
+        sent = 0
+        with open(self.video_file, "rb") as f:
+            while self._is_running:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                sent += len(chunk)
+                percent = int(sent / total * 100) if total else 100
+                self.progress.emit(f"Uploading: {percent}%")
+                yield chunk
+
+    def handle_status(self, status):
+        """Report server-side queue, completion and error messages that arrive in the result stream."""
+        if status["status"] == "queued":
+            eta = status.get("eta_seconds")
+            eta_text = f", about {int(eta)}s" if eta is not None else ""
+            self.progress.emit(
+                f"Queued: position {status['position']}{eta_text}")
+        elif status["status"] == "running":
+            self.progress.emit("Transcription started")
+        elif status["status"] == "completed":
+            self.completed = True
+            if status.get("failed"):
+                # Some segments failed; the transcript has gaps.
+                self.failed = True
+        elif status["status"] == "error":
+            self.failed = True
+            self.error.emit(f"Server error: {status.get('message', '')}")
+
+    def save_transcript(self):
+        """Persist the finished transcript so reopening this video skips transcription."""
+        try:
+            path = stored_transcript_path(self.video_file, self.translate)
+            write_transcript(path, self.segments)
+            export_srt(self.segments, os.path.splitext(path)[0] + ".srt")
+        except Exception as e:
+            print(f"Error saving transcript: {e}")
+
     def stop(self):
         """Stop the transcription process and cleanup."""
         print("Stopping transcription worker...")
         self._is_running = False
-        self.terminate()
-        self.wait()
+        # Closing the stream is what tells the server to cancel the task
+        # and free its workers; it also unblocks iter_lines() in run().
+        if self.response is not None:
+            self.response.close()
+        if not self.wait(5000):
+            self.terminate()
+            self.wait()
         print("Transcription worker stopped.")
@@ -1,8 +1,8 @@
-import os
 from PySide6.QtMultimedia import QMediaPlayer
 from PySide6.QtCore import QTimer, QUrl
-from filelock import FileLock, Timeout
 from VideoPlayerUI import VideoPlayerUI
+from transcript_store import TranscriptStore, TranscriptTailReader
+from TranscriptionComponents.transcript_format import load_transcript
 
 
 class VideoPlayerLogic(VideoPlayerUI):
@@ -11,7 +11,12 @@ class VideoPlayerLogic(VideoPlayerUI):
         self.update_counter = 0
         self.update_interval = 10
         self.manual_position_update = False
-        self.transcript_segments = []
+        self.transcript_segments = TranscriptStore()
+        # Only set when the transcript file is the hand-off (nothing was
+        # streamed in through add_segment); then it is tailed periodically.
+        self.transcript_reader = None
+        # True when the cues came from a stored transcript; nothing to tail then.
+        self.transcript_from_store = False
 
         # Connect signals
         self.rewind_button.clicked.connect(self.rewind_video)
@@ -53,98 +58,55 @@ class VideoPlayerLogic(VideoPlayerUI):
         self.media_player.play()
         self.timer.start(100)
         self.play_button.setText("⏸️")
-        self.transcript_segments = []
 
-        try:
-            transcript_path = "transcription.txt"
-            if os.path.exists(transcript_path):
-                with open(transcript_path, "r", encoding="utf-8") as f:
-                    transcription = f.read()
-                    self.parse_transcription(transcription)
-        except Exception as e:
-            print(f"Error reading initial transcription: {e}")
-
-    def parse_transcription(self, transcription):
-        new_segments = []
-        for line in transcription.strip().split('\n'):
-            if line:
-                try:
-                    time_str, text = line.split(']', 1)
-                    time_str = time_str[1:]
-                    start_str, end_str = time_str.split('-')
-                    start = float(start_str.strip())
-                    end = float(end_str.strip())
-                    new_segments.append({
-                        'start': start,
-                        'end': end,
-                        'text': text.strip()
-                    })
-                except Exception as e:
-                    print(f"Error parsing line: {line}")
-                    continue
-
-        if new_segments:
-            self.transcript_segments = new_segments
+        # Segments normally arrive through add_segment; only fall back to the
+        # persisted copy when nothing was streamed in.
+        if not self.transcript_from_store and len(self.transcript_segments) == 0:
+            self.transcript_reader = TranscriptTailReader("transcription.txt")
+            self.refresh_transcription()
+
+    def reset_transcript(self):
+        self.transcript_reader = None
+        self.transcript_from_store = False
+        self.transcript_segments.clear()
+
+    def load_transcript_file(self, transcript_path):
+        """Show a previously stored transcript instead of a live one.
+
+        Raises ValueError for an empty transcript, which is treated as unusable.
+        """
+        self.reset_transcript()
+        self.transcript_segments.load(load_transcript(transcript_path))
+        if len(self.transcript_segments) == 0:
+            raise ValueError(f"Stored transcript {transcript_path} is empty")
+        self.transcript_from_store = True
+
+    def add_segment(self, segment):
+        self.transcript_segments.append(segment)
 
     def check_subtitle(self):
         current_time = self.media_player.position() / 1000.0
-        current_text = ""
-        for segment in self.transcript_segments:
-            if segment['start'] <= current_time <= segment['end']:
-                current_text = segment['text']
-                break
+        current_text = self.transcript_segments.find(current_time)
 
         if self.subtitle_label.text() != current_text:
             self.subtitle_label.setText(current_text)
 
-        self.update_counter += 1
-        if self.update_counter >= self.update_interval:
-            self.update_counter = 0
-            self.refresh_transcription()
+        if self.transcript_reader is not None:
+            self.update_counter += 1
+            if self.update_counter >= self.update_interval:
+                self.update_counter = 0
+                self.refresh_transcription()
 
     def refresh_transcription(self):
+        """Pick up lines appended to the transcript file since the last refresh."""
         try:
-            transcript_path = "transcription.txt"
-            if not os.path.exists(transcript_path):
-                return
-
-            current_position = self.media_player.position()
-
-            try:
-                lock = FileLock(transcript_path + ".lock", timeout=0.5)
-                with lock:
-                    with open(transcript_path, "r", encoding="utf-8") as f:
-                        transcription = f.read()
-                        new_segments = []
-                        for line in transcription.strip().split('\n'):
-                            if line:
-                                try:
-                                    time_str, text = line.split(']', 1)
-                                    time_str = time_str[1:]
-                                    start_str, end_str = time_str.split('-')
-                                    start = float(start_str.strip())
-                                    end = float(end_str.strip())
-                                    new_segments.append({
-                                        'start': start,
-                                        'end': end,
-                                        'text': text.strip()
-                                    })
-                                except Exception as e:
-                                    print(f"Error parsing line: {line}")
-                                    continue
-
-                        if new_segments:
-                            self.transcript_segments = new_segments
-            except Timeout:
-                print("Transcription file locked, will retry later")
-                return
-
-            if self.media_player.position() != current_position:
-                self.manual_position_update = True
-                self.media_player.setPosition(current_position)
-                QTimer.singleShot(100, self._reset_position_flag)
+            new_segments, rebuilt = self.transcript_reader.read_new()
         except Exception as e:
             print(f"Error refreshing transcription: {e}")
+            return
+        if rebuilt:
+            self.transcript_segments.clear()
+        self.transcript_segments.extend(new_segments)
 
     def toggle_play_pause(self):
         if self.media_player.playbackState() == QMediaPlayer.PlayingState:
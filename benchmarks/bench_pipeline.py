@@ -0,0 +1,197 @@
+"""End-to-end benchmark of /transcribe/ on synthetic media with stub models.
+
+Generates a deterministic video with ffmpeg (harmonic tone bursts separated by
+known silences over low noise), drives TranscriptionServer through the FastAPI
+test client and reports time to first segment, real-time factor and a
+per-stage breakdown from /metrics. Time to first segment is the server's own
+measurement from task start: the test client buffers streamed bodies. Whisper and MarianMT are replaced by stubs
+whose cost is a fixed fraction of the audio they process, so the numbers
+measure the pipeline rather than the models and run on any CPU-only machine.
+
+Run from the repository root:
+    python -m benchmarks.bench_pipeline --seconds 300 --scenario memory wav translate
+"""
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import time
+from collections import namedtuple
+
+import soundfile as sf
+from fastapi.testclient import TestClient
+
+from TranscriptionComponents.model_registry import ModelRegistry
+from TranscriptionComponents.server import TranscriptionServer
+
+# Synthetic speech: 4 s of a 180/360 Hz tone, then 1.5 s of noise only.
+BURST_SECONDS = 4.0
+PERIOD_SECONDS = 5.5
+
+# Report stage -> the log_step names that make it up.
+STAGES = {
+    "prepare_audio": ["Load Audio from Stream", "Load Audio from Video", "Prepare Audio Blocks", "Prepare Audio"],
+    "segment_audio": ["Stream Segment Jobs", "Segment Audio", "Plan Segment Jobs"],
+    "cut_audio_segment": ["Cut Audio Segment"],
+    "transcribe_segment": ["Process Segment", "Process Segment Batch"],
+    "translate_segment": ["Translate Segments"],
+}
+
+SCENARIOS = {
+    "memory": {"in_memory": "true", "language": "false"},
+    "wav": {"in_memory": "false", "language": "false"},
+    "translate": {"in_memory": "true", "language": "true"},
+}
+
+StubSegment = namedtuple("StubSegment", ["start", "end", "text"])
+
+
+class StubWhisperModel:
+    """Stands in for WhisperModel: one segment per call, costing `rtf` x the audio length."""
+
+    def __init__(self, rtf: float, sample_rate: int = 16000):
+        self.rtf = rtf
+        self.sample_rate = sample_rate
+
+    def transcribe(self, audio, language="en", beam_size=5, **kwargs):
+        if isinstance(audio, str):
+            duration = sf.info(audio).duration
+        else:
+            duration = len(audio) / self.sample_rate
+        time.sleep(duration * self.rtf)
+        return iter([StubSegment(0.0, duration, f" stub segment of {duration:.2f}s")]), None
+
+
+class StubEncoding(dict):
+    def to(self, device):
+        return self
+
+
+class StubTokenizer:
+    def __call__(self, texts, **kwargs):
+        return StubEncoding(texts=texts)
+
+    def batch_decode(self, outputs, skip_special_tokens=True):
+        return outputs
+
+
+class StubTranslator:
+    """Stands in for MarianMTModel: returns the input reversed after `seconds_per_text` each."""
+
+    device = "cpu"
+
+    def __init__(self, seconds_per_text: float):
+        self.seconds_per_text = seconds_per_text
+
+    def generate(self, texts):
+        time.sleep(self.seconds_per_text * len(texts))
+        return [text[::-1] for text in texts]
+
+
+def make_media(path: str, seconds: float):
+    """Write a deterministic test video: tone bursts with known silences over low noise."""
+    audio = (f"aevalsrc=exprs='if(lt(mod(t,{PERIOD_SECONDS}),{BURST_SECONDS}),"
+             f"0.3*sin(2*PI*180*t)+0.2*sin(2*PI*360*t),0)+0.003*(2*random(0)-1)'"
+             f":s=16000:d={seconds}")
+    video = f"color=c=black:s=160x120:r=5:d={seconds}"
+    subprocess.run([
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-f", "lavfi", "-i", audio, "-f", "lavfi", "-i", video, "-shortest",
+        "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac",
+        # Index at the front, so the upload can be decoded from a pipe.
+        "-movflags", "+faststart", path
+    ], check=True)
+
+
+def run_scenario(name: str, media_path: str, seconds: float, args) -> dict:
+    """Run one upload against a fresh server in a scratch directory (empty caches)."""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            server = TranscriptionServer(preload_models=(args.model_name,))
+            server.models = ModelRegistry(
+                server.logger,
+                whisper_loader=lambda model_name, cpu_threads=0, num_workers=1: StubWhisperModel(args.whisper_rtf),
+                translation_loader=lambda: (StubTranslator(args.translate_seconds), StubTokenizer()))
+            fields = {"model_name": args.model_name, "max_workers": str(args.max_workers),
+                      **SCENARIOS[name]}
+            with TestClient(server.app) as client:
+                segments = 0
+                start = time.perf_counter()
+                with open(media_path, "rb") as f:
+                    with client.stream("POST", "/transcribe/", data=fields,
+                                       files={"file": ("input.mp4", f, "video/mp4")}) as response:
+                        response.raise_for_status()
+                        for line in response.iter_lines():
+                            if not line:
+                                continue
+                            result = json.loads(line)
+                            if "status" not in result:
+                                segments += 1
+                wall = time.perf_counter() - start
+                metrics = client.get("/metrics").json()
+            # Also flushes the log into the scratch directory before leaving it.
+            server.stop()
+        finally:
+            os.chdir(cwd)
+
+    stages = {}
+    for stage, names in STAGES.items():
+        observed = [metrics["stages"][n] for n in names if n in metrics["stages"]]
+        stages[stage] = {
+            "count": sum(h["count"] for h in observed),
+            "total": round(sum(h["total"] for h in observed), 4),
+            "p50": max((h["p50"] for h in observed), default=0.0),
+            "p95": max((h["p95"] for h in observed), default=0.0),
+        }
+    return {
+        "scenario": name,
+        "audio_seconds": seconds,
+        "segments": segments,
+        "time_to_first_segment": metrics["recent_tasks"][0]["time_to_first_segment"] if metrics["recent_tasks"] else None,
+        "wall_seconds": round(wall, 3),
+        "real_time_factor": round(wall / seconds, 4),
+        "stages": stages,
+    }
+
+
+def print_report(result: dict):
+    print(f"\n== {result['scenario']}: {result['audio_seconds']:.0f}s audio, {result['segments']} segments")
+    print(f"time to first segment {result['time_to_first_segment']}s, wall {result['wall_seconds']}s, "
+          f"RTF {result['real_time_factor']}")
+    print(f"{'stage':20s} {'count':>6s} {'total s':>9s} {'p50 s':>8s} {'p95 s':>8s}")
+    for stage, h in result["stages"].items():
+        print(f"{stage:20s} {h['count']:6d} {h['total']:9.3f} {h['p50']:8.3f} {h['p95']:8.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=120.0, help="length of the synthetic video")
+    parser.add_argument("--scenario", nargs="+", choices=sorted(SCENARIOS), default=["memory", "wav"])
+    parser.add_argument("--model-name", default="small")
+    parser.add_argument("--max-workers", type=int, default=4)
+    parser.add_argument("--whisper-rtf", type=float, default=0.05,
+                        help="stub Whisper cost as a fraction of the audio it transcribes")
+    parser.add_argument("--translate-seconds", type=float, default=0.01,
+                        help="stub MarianMT cost per translated text")
+    parser.add_argument("--json", help="also write the results to this file, for comparing runs")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as media_dir:
+        media_path = os.path.join(media_dir, "synthetic.mp4")
+        make_media(media_path, args.seconds)
+        for name in args.scenario:
+            result = run_scenario(name, os.path.abspath(media_path), args.seconds, args)
+            print_report(result)
+            results.append(result)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Benchmark per-segment delivery latency of the streamed /transcribe/ results.
+
+Compares the original poll-a-thread-queue loop with ResultChannel, with
+several concurrent streams sharing one event loop. Run from the repository root:
+    python -m benchmarks.bench_result_delivery --streams 8 --segments 200
+"""
+import argparse
+import asyncio
+import random
+import threading
+import time
+from queue import Queue
+
+import numpy as np
+
+from TranscriptionComponents.result_channel import ResultChannel
+
+
+async def legacy_stream(queue):
+    """The pre-channel consumer loop, kept verbatim for comparison."""
+    while True:
+        try:
+            result = queue.get(block=True, timeout=0.1)
+            if result == "DONE":
+                break
+            yield result
+        except Exception:
+            await asyncio.sleep(0.1)
+
+
+async def channel_stream(channel):
+    while True:
+        result = await channel.get()
+        if result == "DONE":
+            break
+        yield result
+
+
+def produce(sink, segments, mean_gap, seed):
+    rng = random.Random(seed)
+    for _ in range(segments):
+        time.sleep(rng.expovariate(1 / mean_gap))
+        sink.put(time.perf_counter())
+    sink.put("DONE")
+
+
+async def consume(stream, latencies):
+    async for sent_at in stream:
+        latencies.append(time.perf_counter() - sent_at)
+
+
+async def run(mode, streams, segments, mean_gap):
+    loop = asyncio.get_running_loop()
+    latencies = []
+    consumers = []
+    producers = []
+    for i in range(streams):
+        if mode == "legacy":
+            sink = Queue()
+            stream = legacy_stream(sink)
+        else:
+            sink = ResultChannel(loop)
+            stream = channel_stream(sink)
+        consumers.append(consume(stream, latencies))
+        producers.append(threading.Thread(
+            target=produce, args=(sink, segments, mean_gap, i), daemon=True))
+    for producer in producers:
+        producer.start()
+    start = time.perf_counter()
+    await asyncio.gather(*consumers)
+    return np.array(latencies) * 1000, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--streams", type=int, default=8)
+    parser.add_argument("--segments", type=int, default=200)
+    parser.add_argument("--mean-gap-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    print(f"{args.streams} concurrent streams x {args.segments} segments, "
+          f"mean gap {args.mean_gap_ms:.0f} ms")
+    for mode in ("legacy", "channel"):
+        latencies, wall = asyncio.run(
+            run(mode, args.streams, args.segments, args.mean_gap_ms / 1000))
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        print(f"{mode:8s}: p50 {p50:7.2f} ms  p95 {p95:7.2f} ms  p99 {p99:7.2f} ms  "
+              f"max {latencies.max():7.2f} ms  wall {wall:6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
+import os
 from PySide6.QtWidgets import QMainWindow, QStackedWidget
 from TranscriptionComponents.server import TranscriptionServer
 from scene1 import Scene1
 from scene2 import Scene2
 from VideoPlayerLogic import VideoPlayerLogic
+from transcript_store import stored_transcript_path
 
 
 class MainWindow(QMainWindow):
@@ -43,6 +45,15 @@ class MainWindow(QMainWindow):
     def switch_to_scene2(self, path, language):
         """Switch to Scene2 and start transcription."""
         try:
+            transcript_path = stored_transcript_path(path, language)
+            if os.path.exists(transcript_path):
+                # Already processed: open the stored transcript directly.
+                try:
+                    self.video_player.load_transcript_file(transcript_path)
+                    self.switch_to_video_player(path, language)
+                    return
+                except (OSError, ValueError) as e:
+                    print(f"Stored transcript unusable, transcribing again: {e}")
             self.scene2.reset_scene()
             self.scene2.transcript(path, language)
             self.stacked_widget.setCurrentIndex(self.SCENE2_INDEX)
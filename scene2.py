@@ -81,6 +81,12 @@ class Scene2(QWidget):
         self.transcription_worker = TranscriptionWorkerAPI(
             video_path, self.language, self.transcription_server)
         self.transcription_worker.progress.connect(self.update_progress)
+        # Segments go straight into the player's store, before the first one
+        # triggers the switch to the player.
+        video_player = self.main_window.video_player
+        video_player.reset_transcript()
+        self.transcription_worker.segment_received.connect(
+            video_player.add_segment)
         self.transcription_worker.receive_first_segment.connect(
             self.handle_transcription)
         self.transcription_worker.error.connect(self.handle_error)
@@ -0,0 +1,63 @@
+import threading
+import time
+from queue import Queue
+
+from TranscriptionComponents.scheduler import TranscriptionScheduler
+from TranscriptionComponents.segment_ordering import SegmentReorderBuffer
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_shutdown_does_not_strand_a_task_waiting_for_a_reorder_slot():
+    scheduler = TranscriptionScheduler(worker_budget=1, max_active_tasks=1, max_queue_depth=0)
+    release = threading.Event()
+    started = threading.Event()
+    finished = threading.Event()
+
+    def run():
+        # The submit loop of process_video_with_streaming, in miniature.
+        buffer = SegmentReorderBuffer(Queue(), window=2)
+
+        def segment(job_idx):
+            started.set()
+            release.wait()
+            buffer.put(job_idx, [])
+
+        futures = []
+        with scheduler.executor("task", max_workers=1) as executor:
+            for job_idx in range(6):
+                if not scheduler.is_running():
+                    break
+                buffer.wait_for_slot(job_idx)
+                future = executor.submit(segment, job_idx)
+                buffer.track(future, [job_idx])
+                futures.append(future)
+        finished.set()
+
+    scheduler.submit_task("task", run)
+    assert started.wait(5)
+    # Job 0 runs, job 1 is queued and job 2 waits for a reorder slot.
+    scheduler.shutdown()
+    release.set()
+
+    assert finished.wait(5)
+    assert wait_until(lambda: scheduler.stats()["active_tasks"] == 0)
+
+
+def test_cancelled_units_release_later_results():
+    output = Queue()
+    buffer = SegmentReorderBuffer(output, window=2)
+    scheduler = TranscriptionScheduler(worker_budget=1)
+    scheduler.shutdown()
+    with scheduler.executor("task", max_workers=1) as executor:
+        buffer.track(executor.submit(lambda: None), [0])
+    buffer.put(1, [{"text": "later"}])
+
+    assert output.get_nowait() == {"text": "later", "index": 1}
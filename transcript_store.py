@@ -0,0 +1,203 @@
+import hashlib
+import os
+import threading
+from array import array
+from bisect import bisect_right
+from queue import Queue, Empty
+
+from filelock import FileLock
+
+TRANSCRIPTS_DIR = "transcripts"
+
+
+def stored_transcript_path(video_path, language):
+    """Where the finished transcript of a video is kept; changes if the video file does."""
+    stat = os.stat(video_path)
+    key = f"{os.path.abspath(video_path)}|{stat.st_size}|{stat.st_mtime_ns}|{bool(language)}"
+    return os.path.join(TRANSCRIPTS_DIR, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".gptr")
+
+
+def parse_transcript_line(line):
+    """Parse one "[start - end] text" line into a segment dict, or None if malformed."""
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        time_str, text = line.split(']', 1)
+        start_str, end_str = time_str[1:].split('-')
+        return {
+            'start': float(start_str.strip()),
+            'end': float(end_str.strip()),
+            'text': text.strip()
+        }
+    except ValueError:
+        print(f"Error parsing line: {line}")
+        return None
+
+
+class TranscriptStore:
+    """Subtitle cues sorted by start time in parallel arrays, with bisect lookup.
+
+    Streamed segments may be appended out of order; each is inserted at its
+    sorted position. `find` remembers the last cue it resolved, so the usual
+    case of playback staying on a cue or moving to the next one is O(1).
+    Cues are assumed not to overlap, as Whisper's do not.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.starts = array('d')
+        self.ends = array('d')
+        self.texts = []
+        self._cursor = -1
+
+    def load(self, transcript):
+        """Replace the cues with a loaded Transcript; its text stays lazily decoded."""
+        self.clear()
+        self.starts.frombytes(transcript.starts.tobytes())
+        self.ends.frombytes(transcript.ends.tobytes())
+        self.texts = transcript.texts
+
+    def append(self, segment):
+        if not isinstance(self.texts, list):
+            self.texts = list(self.texts)
+        start = segment['start']
+        if not self.starts or start >= self.starts[-1]:
+            i = len(self.starts)
+        else:
+            i = bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, segment['end'])
+        self.texts.insert(i, segment['text'])
+        if i <= self._cursor:
+            self._cursor += 1
+
+    def extend(self, segments):
+        for segment in segments:
+            self.append(segment)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        for start, end, text in zip(self.starts, self.ends, self.texts):
+            yield {'start': start, 'end': end, 'text': text}
+
+    def _cue_index(self, current_time):
+        """Index of the last cue starting at or before `current_time`, or -1."""
+        starts = self.starts
+        n = len(starts)
+        for i in (self._cursor, self._cursor + 1):
+            if 0 <= i < n and starts[i] <= current_time and (i + 1 == n or current_time < starts[i + 1]):
+                return i
+        return bisect_right(starts, current_time) - 1
+
+    def find(self, current_time):
+        """Return the text of the segment covering `current_time`, or ""."""
+        i = self._cue_index(current_time)
+        self._cursor = i
+        if i >= 0 and current_time <= self.ends[i]:
+            return self.texts[i]
+        return ""
+
+
+class TranscriptTailReader:
+    """Reads only what was appended to a transcript file since the last call.
+
+    A trailing partial line is held back until it is complete. If the file was
+    replaced, truncated or rewritten in place (detected by inode, size and the
+    first bytes), reading restarts from the beginning and the caller is told
+    to rebuild.
+    """
+
+    HEAD_BYTES = 64
+
+    def __init__(self, path):
+        self.path = path
+        self._reset()
+
+    def _reset(self):
+        self._offset = 0
+        self._identity = None
+        self._head = b""
+        self._partial = b""
+
+    def read_new(self):
+        """Return (segments, rebuilt): newly appended segments, and whether to discard earlier ones."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            rebuilt = self._offset > 0
+            self._reset()
+            return [], rebuilt
+        rebuilt = False
+        with open(self.path, "rb") as f:
+            identity = (stat.st_dev, stat.st_ino)
+            if self._identity is not None and (
+                    identity != self._identity or stat.st_size < self._offset
+                    or f.read(len(self._head)) != self._head):
+                self._reset()
+                rebuilt = True
+            self._identity = identity
+            if stat.st_size == self._offset:
+                return [], rebuilt
+            f.seek(self._offset)
+            data = f.read(stat.st_size - self._offset)
+        if len(self._head) < self.HEAD_BYTES:
+            self._head = (self._head + data)[:self.HEAD_BYTES]
+        self._offset += len(data)
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()
+        segments = []
+        for line in lines:
+            segment = parse_transcript_line(line.decode("utf-8", errors="replace"))
+            if segment is not None:
+                segments.append(segment)
+        return segments, rebuilt
+
+
+class TranscriptFileWriter:
+    """Appends transcript lines to a text file from a background thread.
+
+    The file is only a persisted copy; the player is fed through signals, so
+    writes are batched and never block the stream reader.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = FileLock(path + ".lock")
+        self._lines = Queue()
+        self._stop = object()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, line):
+        self._lines.put(line)
+
+    def close(self):
+        """Flush everything written so far and stop the thread."""
+        self._lines.put(self._stop)
+        self._thread.join()
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch = [self._lines.get()]
+            while True:
+                try:
+                    batch.append(self._lines.get_nowait())
+                except Empty:
+                    break
+            if self._stop in batch:
+                stop = True
+                batch = [line for line in batch if line is not self._stop]
+            if not batch:
+                continue
+            try:
+                with self.lock:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.writelines(batch)
+            except Exception as e:
+                print(f"Error writing transcription file: {e}")